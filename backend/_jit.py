@@ -0,0 +1,364 @@
+"""Numba-compiled kernels for the analytics hot path
+
+Falls back to a no-op ``njit`` decorator when numba is not installed so the
+kernels still run (slower) as plain Python.
+"""
+import logging
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Try to import numba
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    logger.warning("numba not installed. Analytics kernels will run as plain Python.")
+
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit supporting both decorator forms."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+
+@njit(cache=True)
+def window_delta(ts, qty, side, cutoff):
+    """Sum buy/sell aggressor volume for trades newer than ``cutoff``.
+
+    ``ts`` must be sorted ascending; ``side`` is 0 for buy and 1 for sell
+    aggressors. Returns (v_buy, v_sell, trade_count).
+    """
+    start = np.searchsorted(ts, cutoff, side='right')
+    v_buy = 0.0
+    v_sell = 0.0
+    for i in range(start, ts.shape[0]):
+        if side[i] == 0:
+            v_buy += qty[i]
+        else:
+            v_sell += qty[i]
+    return v_buy, v_sell, ts.shape[0] - start
+
+
+@njit(cache=True)
+def swing_extrema(prices, lookback):
+    """Flag swing highs/lows: points equal to the max/min of their centered window.
+
+    Sliding-window max/min are maintained with monotonic index deques, so
+    the scan is O(n) regardless of ``lookback``. Returns (is_high, is_low)
+    boolean masks aligned with ``prices``.
+    """
+    n = prices.shape[0]
+    width = 2 * lookback + 1
+    is_high = np.zeros(n, np.bool_)
+    is_low = np.zeros(n, np.bool_)
+    if n < width:
+        return is_high, is_low
+    
+    # Every index is pushed once, so plain arrays with head/tail work as deques
+    max_q = np.empty(n, np.int64)
+    min_q = np.empty(n, np.int64)
+    max_head = max_tail = 0
+    min_head = min_tail = 0
+    
+    for j in range(n):
+        while max_tail > max_head and prices[max_q[max_tail - 1]] <= prices[j]:
+            max_tail -= 1
+        max_q[max_tail] = j
+        max_tail += 1
+        while min_tail > min_head and prices[min_q[min_tail - 1]] >= prices[j]:
+            min_tail -= 1
+        min_q[min_tail] = j
+        min_tail += 1
+        
+        start = j - width + 1
+        if start < 0:
+            continue
+        while max_q[max_head] < start:
+            max_head += 1
+        while min_q[min_head] < start:
+            min_head += 1
+        
+        i = j - lookback
+        if prices[i] == prices[max_q[max_head]]:
+            is_high[i] = True
+        if prices[i] == prices[min_q[min_head]]:
+            is_low[i] = True
+    
+    return is_high, is_low
+
+
+@njit(cache=True)
+def depth_refill_stats(buf, head, count):
+    """Refill statistics over one level's circular depth history.
+
+    ``buf`` is the level's ring of depth snapshots, ``head`` the next write
+    slot and ``count`` the number of valid snapshots. Returns
+    (refill_magnitude, consume_magnitude, refills) where refills counts
+    decrease-then-increase patterns.
+    """
+    cap = buf.shape[0]
+    start = (head - count) % cap
+    refill = 0.0
+    consume = 0.0
+    refills = 0
+    prev2 = 0.0
+    prev = buf[start]
+    for k in range(1, count):
+        cur = buf[(start + k) % cap]
+        diff = cur - prev
+        if diff > 0:
+            refill += diff
+        else:
+            consume -= diff
+        if k >= 2 and prev < prev2 and cur > prev:
+            refills += 1
+        prev2 = prev
+        prev = cur
+    return refill, consume, refills
+
+
+@njit(cache=True)
+def absorption_kernel(v_hit, l_vis, l_res, eps):
+    """Per-level absorption score and strength.
+
+    score = V_hit / (V_hit + L_vis + eps)
+    strength = (V_hit + L_res) / (V_hit + L_vis + L_res + eps)
+    """
+    n = v_hit.shape[0]
+    score = np.empty(n, np.float64)
+    strength = np.empty(n, np.float64)
+    for i in range(n):
+        score[i] = v_hit[i] / (v_hit[i] + l_vis[i] + eps)
+        strength[i] = (v_hit[i] + l_res[i]) / (v_hit[i] + l_vis[i] + l_res[i] + eps)
+    return score, strength
+
+
+@njit(cache=True)
+def iceberg_kernel(fdr, refill, persist, a0, a1, a2, a3):
+    """Per-level iceberg probability σ(a0 + a1*FDR + a2*refill + a3*persist)."""
+    n = fdr.shape[0]
+    prob = np.empty(n, np.float64)
+    for i in range(n):
+        z = a0 + a1 * fdr[i] + a2 * refill[i] + a3 * persist[i]
+        prob[i] = 1.0 / (1.0 + np.exp(-z))
+    return prob
+
+
+@njit(cache=True)
+def regime_stats(prices):
+    """Return statistics for regime detection.
+
+    Returns (volatility, mean_abs_return, persistence) for the simple returns
+    of ``prices``: the population std of the returns, their mean absolute
+    value, and the Pearson correlation of r[:-1] with r[1:] (0 when either
+    side has no variance).
+    """
+    n = prices.shape[0] - 1
+    r = np.empty(n, np.float64)
+    for i in range(n):
+        r[i] = (prices[i + 1] - prices[i]) / prices[i]
+    
+    mean = r.mean()
+    var = 0.0
+    abs_sum = 0.0
+    for i in range(n):
+        d = r[i] - mean
+        var += d * d
+        abs_sum += abs(r[i])
+    volatility = np.sqrt(var / n)
+    
+    persistence = 0.0
+    if n > 1:
+        mean_a = r[:-1].mean()
+        mean_b = r[1:].mean()
+        s_ab = 0.0
+        s_aa = 0.0
+        s_bb = 0.0
+        for i in range(n - 1):
+            da = r[i] - mean_a
+            db = r[i + 1] - mean_b
+            s_ab += da * db
+            s_aa += da * da
+            s_bb += db * db
+        denom = np.sqrt(s_aa * s_bb)
+        if denom > 0:
+            persistence = s_ab / denom
+    
+    return volatility, abs_sum / n, persistence
+
+
+@njit(cache=True)
+def level_refill_stats(depths, head, count, rows, eps):
+    """Refill intensity and refill frequency for several depth-history rows.
+
+    ``rows`` indexes into ``depths``/``head``/``count``; -1 (untracked) or a
+    history shorter than 3 snapshots yields zeros. Returns
+    (intensity, frequency) arrays aligned with ``rows``.
+    """
+    n = rows.shape[0]
+    intensity = np.zeros(n, np.float64)
+    frequency = np.zeros(n, np.float64)
+    for i in range(n):
+        row = rows[i]
+        if row < 0 or count[row] < 3:
+            continue
+        refill, consume, refills = depth_refill_stats(depths[row], head[row], count[row])
+        intensity[i] = refill / (consume + eps)
+        frequency[i] = refills / (count[row] - 2)
+    return intensity, frequency
+
+
+@njit(cache=True)
+def aggregate_trades(px, qty, ts, sell, tick_scale):
+    """Split a trade batch into aggressor volume and per-tick level hits.
+
+    Prices are rounded to integer ticks with ``tick_scale``. Returns
+    (v_buy, v_sell, ticks, volume, count, first_ts, last_ts) with one entry
+    per distinct tick in ascending order; first/last are in batch order.
+    """
+    n = px.shape[0]
+    v_buy = 0.0
+    v_sell = 0.0
+    raw = np.empty(n, np.int64)
+    for i in range(n):
+        if sell[i]:
+            v_sell += qty[i]
+        else:
+            v_buy += qty[i]
+        raw[i] = np.int64(px[i] * tick_scale + 0.5)
+    order = np.argsort(raw, kind='mergesort')
+    ticks = np.empty(n, np.int64)
+    volume = np.zeros(n, np.float64)
+    count = np.zeros(n, np.int32)
+    first_ts = np.empty(n, np.int64)
+    last_ts = np.empty(n, np.int64)
+    m = -1
+    for j in range(n):
+        i = order[j]
+        if m < 0 or raw[i] != ticks[m]:
+            m += 1
+            ticks[m] = raw[i]
+            first_ts[m] = ts[i]
+        volume[m] += qty[i]
+        count[m] += 1
+        last_ts[m] = ts[i]
+    m += 1
+    return v_buy, v_sell, ticks[:m], volume[:m], count[:m], first_ts[:m], last_ts[:m]
+
+
+@njit(cache=True)
+def simulate_tick(state):
+    """Advance the simulated random walk by one trade.
+    
+    ``state`` is [price, trend, trend_duration] and is updated in place: the
+    trend is re-drawn every 50-200 steps and the price takes a Gaussian step
+    around it (floored at 1). Returns (quantity, is_sell_aggressor) for the
+    trade printed at the new price.
+    """
+    state[2] += 1
+    if state[2] > np.random.randint(50, 201):
+        state[1] = (np.random.randint(0, 3) - 1) * np.random.uniform(0.01, 0.05)
+        state[2] = 0
+    state[0] = max(state[0] + state[1] + np.random.normal(0.0, 0.1), 1.0)
+    
+    # Pareto(alpha) + 1 matches random.paretovariate(alpha)
+    volume = min(np.random.pareto(1.5) + 1.0, 100.0)
+    is_buyer = np.random.random() > 0.5 + state[1] * 2
+    return volume, not is_buyer
+
+
+@njit(cache=True)
+def simulate_batch(state, ticks):
+    """Advance the simulated random walk by one batch of trades.
+    
+    ``state`` is updated in place as in simulate_tick. Row i of ``ticks`` is
+    filled with [trade_price, quantity, is_sell, trade_id, spread, sleep_s]
+    like simulate_xauusd_batch; spread is 0 for the ~70% of ticks that carry
+    no book update.
+    """
+    for i in range(ticks.shape[0]):
+        volume, is_sell = simulate_tick(state)
+        ticks[i, 0] = round(state[0], 4)
+        ticks[i, 1] = round(volume, 4)
+        ticks[i, 2] = 1.0 if is_sell else 0.0
+        ticks[i, 3] = 1 + int(np.random.random() * 1000000)
+        if np.random.random() > 0.7:
+            ticks[i, 4] = (0.01 + 0.04 * np.random.random()) * state[0] / 100
+        else:
+            ticks[i, 4] = 0.0
+        ticks[i, 5] = 0.02 + 0.08 * np.random.random()
+
+
+@njit(cache=True)
+def simulate_book(mid, spread, bid_px, bid_qty, ask_px, ask_qty):
+    """Fill preallocated bid/ask price and quantity columns around ``mid``.
+    
+    Levels are half a spread apart and depth decays as 1/(level + 1).
+    Values are rounded to 4 decimals like the simulated trades.
+    """
+    for i in range(bid_px.shape[0]):
+        bid_px[i] = round(mid - spread / 2 - i * spread * 0.5, 4)
+        ask_px[i] = round(mid + spread / 2 + i * spread * 0.5, 4)
+        bid_qty[i] = round(np.random.uniform(10.0, 100.0) / (i + 1), 4)
+        ask_qty[i] = round(np.random.uniform(10.0, 100.0) / (i + 1), 4)
+
+
+@njit(cache=True)
+def simulate_xauusd_batch(price, volatility, ticks, bid_px, bid_qty, ask_px, ask_qty):
+    """Simulate a batch of XAUUSD ticks, one trade and one book each.
+    
+    The mid takes Gaussian steps clamped to [1800, 2800]. Row i of ``ticks``
+    is filled with [trade_price, quantity, is_sell, trade_id, spread, sleep_s]
+    and row i of the (batch, levels) book columns with the book around that
+    tick's mid, levels 0.1 apart. Returns the mid after the batch.
+    """
+    levels = bid_px.shape[1]
+    for i in range(ticks.shape[0]):
+        price = min(max(price + np.random.normal(0.0, volatility), 1800.0), 2800.0)
+        spread = np.random.uniform(0.1, 0.3)
+        ticks[i, 0] = round(price + np.random.uniform(-0.1, 0.1), 2)
+        ticks[i, 1] = round(np.random.uniform(0.1, 10.0), 2)
+        ticks[i, 2] = 1.0 if np.random.random() > 0.5 else 0.0
+        ticks[i, 3] = np.random.randint(100000, 1000000)
+        ticks[i, 4] = spread
+        ticks[i, 5] = np.random.uniform(0.05, 0.2)
+        
+        best_bid = round(price - spread / 2, 2)
+        best_ask = round(price + spread / 2, 2)
+        for k in range(levels):
+            bid_px[i, k] = round(best_bid - k * 0.1, 2)
+            ask_px[i, k] = round(best_ask + k * 0.1, 2)
+            bid_qty[i, k] = round(np.random.uniform(1.0, 50.0), 2)
+            ask_qty[i, k] = round(np.random.uniform(1.0, 50.0), 2)
+    return price
+
+
+def warmup():
+    """Compile every kernel up front with the argument types the engine uses.
+
+    With ``cache=True`` the machine code is reused from __pycache__ after the
+    first run, but the first call in a fresh deployment still pays the full
+    JIT cost. Calling this at startup keeps that stall off the live feed.
+    """
+    if not NUMBA_AVAILABLE:
+        return
+    start = time.perf_counter()
+    f8 = np.zeros(16, np.float64)
+    i8 = np.zeros(16, np.int64)
+    window_delta(i8, f8, np.zeros(16, np.int8), 0)
+    swing_extrema(f8, 5)
+    depth_refill_stats(f8, np.int64(0), 0)
+    level_refill_stats(np.zeros((4, 16), np.float64), i8[:4], i8[:4], i8[:4], 1e-10)
+    aggregate_trades(f8, f8, i8, np.zeros(16, np.bool_), 100)
+    absorption_kernel(f8, f8, f8, 1e-10)
+    iceberg_kernel(f8, f8, f8, 0.0, 0.0, 0.0, 0.0)
+    regime_stats(np.ones(16, np.float64))
+    simulate_batch(np.array([100.0, 0.0, 0.0]), np.empty((2, 6)))
+    simulate_book(100.0, 0.01, f8[:4], f8[4:8], f8[8:12], f8[12:])
+    book = np.empty((4, 2, 4))
+    simulate_xauusd_batch(2350.0, 0.5, np.empty((2, 6)), book[0], book[1], book[2], book[3])
+    logger.info(f"Analytics kernels compiled in {time.perf_counter() - start:.2f}s")
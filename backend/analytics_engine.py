@@ -10,31 +10,43 @@ Implements all the quantitative formulas for HFT signal generation:
 """
 import numpy as np
 from typing import List, Dict, Tuple, Optional
-from collections import deque
 from datetime import datetime, timedelta
 import math
+import time
 from models import (
-    Trade, OrderBook, Tick, DeltaMetrics, AbsorptionMetrics,
+    Trade, OrderBook, DeltaMetrics, AbsorptionMetrics,
     IcebergMetrics, MomentumMetrics, StructureMetrics, LiquidityMetrics,
     TradingSignal, SignalType, SignalBreakdown, MarketRegime, SignalWeights
 )
+from rolling import RollingBuffer, SlidingMedian
+from _jit import (
+    window_delta, swing_extrema, depth_refill_stats, absorption_kernel, iceberg_kernel,
+    regime_stats, level_refill_stats, aggregate_trades
+)
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
 
 
 class AnalyticsEngine:
     """Core analytics engine for order flow analysis and signal generation."""
     
     EPSILON = 1e-10  # Small constant to avoid division by zero
+    METRICS_MAX_AGE_NS = 25_000_000  # Reuse get_all_metrics results this long without new data
     
     def __init__(self, window_size: int = 100, micro_bar_ms: int = 500):
         self.window_size = window_size
         self.micro_bar_ms = micro_bar_ms
         
         # Rolling data structures
-        self.trades: deque = deque(maxlen=10000)
-        self.ticks: deque = deque(maxlen=10000)
-        self.order_books: deque = deque(maxlen=1000)
-        self.prices: deque = deque(maxlen=5000)
-        self.volumes: deque = deque(maxlen=5000)
+        self.trade_count = 0  # Trades ingested since start
+        self.order_book: Optional[OrderBook] = None  # Latest book snapshot
+        self.prices = RollingBuffer(5000)
+        
+        # SoA trade window (ns timestamps, quantity, side: 0 = buy aggressor, 1 = sell)
+        self._trade_ts = RollingBuffer(10000, np.int64)
+        self._trade_qty = RollingBuffer(10000, np.float64)
+        self._trade_side = RollingBuffer(10000, np.int8)
         
         # Cumulative metrics
         self.cumulative_delta = 0.0
@@ -42,25 +54,53 @@ class AnalyticsEngine:
         self.total_sell_volume = 0.0
         
         # Level tracking for absorption/iceberg detection
-        self.level_hits: Dict[float, Dict] = {}  # price -> {hits, volume, timestamps}
-        self.level_depth_history: Dict[float, List[float]] = {}  # price -> [depth snapshots]
+        # Price levels are keyed by integer tick (price * tick_scale);
+        # level_hits maps a tick to a row in the _lh_* arrays
+        self.tick_scale = 100
+        self.level_hits: Dict[int, int] = {}
+        self._lh_free: List[int] = []
+        self._lh_rows = 0
+        self._lh_vol = np.zeros(256, np.float64)
+        self._lh_count = np.zeros(256, np.int32)
+        self._lh_first_ts = np.zeros(256, np.int64)
+        self._lh_last_ts = np.zeros(256, np.int64)
+        self._trades_since_clean = 0
+        # level_depth_history maps a tick to a row of circular depth snapshots in _dh_depths
+        self.depth_history_len = 100
+        self.level_depth_history: Dict[int, int] = {}
+        self._dh_depths = np.zeros((256, self.depth_history_len), np.float64)
+        self._dh_head = np.zeros(256, np.int64)
+        self._dh_count = np.zeros(256, np.int64)
+        
+        # Latest book's top 10 bids followed by top 10 asks, cached on ingestion
+        self._top_ticks: List[int] = []
+        self._top_qty = np.zeros(0, np.float64)
+        self._top_n_bids = 0
+        self._top5_bid_depth = 0.0
+        self._top5_ask_depth = 0.0
         
         # ATR calculation
         self.atr_period = 14
-        self.atr_values: deque = deque(maxlen=100)
-        self.high_prices: deque = deque(maxlen=100)
-        self.low_prices: deque = deque(maxlen=100)
-        self.close_prices: deque = deque(maxlen=100)
+        self.atr_values = SlidingMedian(100)
+        self._high = RollingBuffer(100)
+        self._low = RollingBuffer(100)
+        self._close = RollingBuffer(100)
         
         # Median values for normalization
+        self.current_spread: Optional[float] = None  # From the latest book or BBO update
         self.median_spread = 0.0
         self.median_atr = 0.0
-        self.spreads: deque = deque(maxlen=1000)
+        self.spreads = SlidingMedian(1000)
         
         # Structure detection
         self.swing_highs: List[Tuple[datetime, float]] = []
         self.swing_lows: List[Tuple[datetime, float]] = []
         
+        # Last get_all_metrics result; any ingested data marks it dirty
+        self._metrics_cache: Optional[Dict] = None
+        self._metrics_ns = 0
+        self._metrics_dirty = True
+        
         # Signal weights (configurable)
         self.weights = SignalWeights()
         
@@ -78,16 +118,39 @@ class AnalyticsEngine:
             'b1': 2.0,
             'lambda': 2.0  # distance sensitivity
         }
+        self._refresh_coeffs()
     
     def update_weights(self, weights: SignalWeights):
         """Update signal weights."""
         self.weights = weights
     
+    def update_coeffs(self, iceberg: Optional[Dict[str, float]] = None, trp: Optional[Dict[str, float]] = None):
+        """Update iceberg and/or TRP model coefficients."""
+        if iceberg:
+            self.iceberg_coeffs.update(iceberg)
+        if trp:
+            self.trp_coeffs.update(trp)
+        self._refresh_coeffs()
+        self._metrics_dirty = True
+    
+    def _refresh_coeffs(self):
+        """Mirror the coefficient dicts into float attributes read on the hot path."""
+        self._a0 = float(self.iceberg_coeffs['a0'])
+        self._a1 = float(self.iceberg_coeffs['a1'])
+        self._a2 = float(self.iceberg_coeffs['a2'])
+        self._a3 = float(self.iceberg_coeffs['a3'])
+        self._b0 = float(self.trp_coeffs['b0'])
+        self._b1 = float(self.trp_coeffs['b1'])
+        self._lambda = float(self.trp_coeffs['lambda'])
+    
     def add_trade(self, trade: Trade):
         """Process a new trade."""
-        self.trades.append(trade)
+        self._metrics_dirty = True
+        self.trade_count += 1
         self.prices.append(trade.price)
-        self.volumes.append(trade.quantity)
+        self._trade_ts.append((trade.timestamp - _EPOCH) // _MICROSECOND * 1000)
+        self._trade_qty.append(trade.quantity)
+        self._trade_side.append(1 if trade.is_buyer_maker else 0)
         
         # Update cumulative delta
         if not trade.is_buyer_maker:  # Buy aggressor
@@ -98,86 +161,221 @@ class AnalyticsEngine:
             self.total_sell_volume += trade.quantity
         
         # Track level hits for absorption detection
-        price_level = round(trade.price, 2)
-        if price_level not in self.level_hits:
-            self.level_hits[price_level] = {'hits': 0, 'volume': 0.0, 'timestamps': []}
-        self.level_hits[price_level]['hits'] += 1
-        self.level_hits[price_level]['volume'] += trade.quantity
-        self.level_hits[price_level]['timestamps'].append(trade.timestamp)
+        ts_ns = self._trade_ts.last()
+        tick = self._to_tick(trade.price)
+        row = self.level_hits.get(tick)
+        if row is None:
+            row = self._new_level_row()
+            self.level_hits[tick] = row
+            self._lh_vol[row] = 0.0
+            self._lh_count[row] = 0
+            self._lh_first_ts[row] = ts_ns
+        self._lh_vol[row] += trade.quantity
+        self._lh_count[row] += 1
+        self._lh_last_ts[row] = ts_ns
+        
+        # Clean old level data
+        self._trades_since_clean += 1
+        if self._trades_since_clean >= 256:
+            self._clean_old_level_data()
+    
+    def add_trades(self, trades: List[Trade]):
+        """Process a batch of trades, e.g. every trade decoded from one feed message.
+        
+        Equivalent to calling add_trade for each trade in order, but the
+        rolling windows, delta totals and level hits are updated with array
+        operations once per batch.
+        """
+        n = len(trades)
+        if n == 0:
+            return
+        
+        px = np.fromiter((t.price for t in trades), np.float64, n)
+        qty = np.fromiter((t.quantity for t in trades), np.float64, n)
+        sell = np.fromiter((t.is_buyer_maker for t in trades), np.bool_, n)
+        ts = np.fromiter(((t.timestamp - _EPOCH) // _MICROSECOND * 1000 for t in trades), np.int64, n)
+        self.add_trade_arrays(px, qty, ts, sell)
+    
+    def add_trade_arrays(self, px: np.ndarray, qty: np.ndarray, ts: np.ndarray, side: np.ndarray):
+        """Process a batch of trades given as columns, e.g. a TradeRingBuffer drain.
+        
+        ``ts`` is epoch nanoseconds and ``side`` is truthy for sell aggressors
+        (buyer-maker prints), matching Trade.is_buyer_maker.
+        """
+        n = len(px)
+        if n == 0:
+            return
+        sell = side.astype(np.bool_)
+        
+        self._metrics_dirty = True
+        self.trade_count += n
+        self.prices.extend(px)
+        self._trade_ts.extend(ts)
+        self._trade_qty.extend(qty)
+        self._trade_side.extend(sell.astype(np.int8))
+        
+        # Aggressor volume and per-tick level hits in one compiled pass
+        buy_volume, sell_volume, ticks, tick_vol, tick_count, first_ts, last_ts = aggregate_trades(
+            px, qty, ts, sell, self.tick_scale
+        )
+        # Update cumulative delta (+qty for buy aggressors, -qty for sell aggressors)
+        self.cumulative_delta += buy_volume - sell_volume
+        self.total_buy_volume += buy_volume
+        self.total_sell_volume += sell_volume
+        
+        # Track level hits, aggregated per price tick
+        rows = np.empty(len(ticks), np.int64)
+        for i, tick in enumerate(ticks.tolist()):
+            row = self.level_hits.get(tick)
+            if row is None:
+                row = self._new_level_row()
+                self.level_hits[tick] = row
+                self._lh_vol[row] = 0.0
+                self._lh_count[row] = 0
+                self._lh_first_ts[row] = first_ts[i]
+            rows[i] = row
+        self._lh_vol[rows] += tick_vol
+        self._lh_count[rows] += tick_count
+        self._lh_last_ts[rows] = last_ts
         
         # Clean old level data
-        self._clean_old_level_data()
+        self._trades_since_clean += n
+        if self._trades_since_clean >= 256:
+            self._clean_old_level_data()
     
     def add_order_book(self, order_book: OrderBook):
         """Process order book update."""
-        self.order_books.append(order_book)
-        self.spreads.append(order_book.spread)
+        self.order_book = order_book
+        self._record_spread(order_book.spread)
+        
+        # Track depth at each level for iceberg detection
+        n_bids = len(order_book.bid_px)
+        px = np.concatenate((order_book.bid_px, order_book.ask_px))
+        qty = np.concatenate((order_book.bid_qty, order_book.ask_qty))
+        tick_arr = (px * self.tick_scale + 0.5).astype(np.int64)
+        # Levels finer than tick_scale (e.g. half-cent prices) can round onto
+        # the same tick; their depth is summed so each tick gets one snapshot
+        # and the scatter below sees unique rows
+        level_ticks, inverse = np.unique(tick_arr, return_inverse=True)
+        level_qty = np.bincount(inverse, weights=qty, minlength=len(level_ticks))
+        history = self.level_depth_history
+        rows = np.empty(len(level_ticks), np.int64)
+        for i, tick in enumerate(level_ticks.tolist()):
+            row = history.get(tick)
+            if row is None:
+                row = self._new_depth_row()
+                history[tick] = row
+            rows[i] = row
+        
+        head = self._dh_head[rows]
+        self._dh_depths[rows, head] = level_qty
+        self._dh_head[rows] = (head + 1) % self.depth_history_len
+        self._dh_count[rows] = np.minimum(self._dh_count[rows] + 1, self.depth_history_len)
+        
+        # Cache top-of-book inputs shared by the delta/absorption/iceberg sweeps
+        top_bids = min(n_bids, 10)
+        self._top_ticks = tick_arr[:top_bids].tolist() + tick_arr[n_bids:n_bids + 10].tolist()
+        self._top_qty = np.concatenate((qty[:top_bids], qty[n_bids:n_bids + 10]))
+        self._top_n_bids = top_bids
+        self._top5_bid_depth = float(qty[:min(n_bids, 5)].sum())
+        self._top5_ask_depth = float(qty[n_bids:n_bids + 5].sum())
+    
+    def add_top_of_book(self, best_bid: float, best_ask: float, bid_size: float, ask_size: float):
+        """Process a best bid/offer update.
+        
+        Only the spread statistics move; depth-based metrics keep using the
+        latest full book from add_order_book.
+        """
+        self._record_spread(best_ask - best_bid)
+    
+    def _record_spread(self, spread: float):
+        self._metrics_dirty = True
+        self.current_spread = spread
+        self.spreads.append(spread)
         
         # Update median spread
         if len(self.spreads) > 10:
-            self.median_spread = np.median(list(self.spreads))
-        
-        # Track depth at each level for iceberg detection
-        for level in order_book.bids + order_book.asks:
-            price = round(level.price, 2)
-            if price not in self.level_depth_history:
-                self.level_depth_history[price] = []
-            self.level_depth_history[price].append(level.quantity)
-            # Keep only recent depth history
-            if len(self.level_depth_history[price]) > 100:
-                self.level_depth_history[price] = self.level_depth_history[price][-100:]
+            self.median_spread = self.spreads.median()
     
     def add_candle(self, high: float, low: float, close: float):
         """Add candle data for ATR calculation."""
-        self.high_prices.append(high)
-        self.low_prices.append(low)
-        self.close_prices.append(close)
+        self._metrics_dirty = True
+        self._high.append(high)
+        self._low.append(low)
+        self._close.append(close)
         self._calculate_atr()
     
+    def _new_level_row(self) -> int:
+        """Allocate a row in the level arrays, growing them when full."""
+        if self._lh_free:
+            return self._lh_free.pop()
+        if self._lh_rows == self._lh_vol.shape[0]:
+            grow = self._lh_rows
+            self._lh_vol = np.concatenate((self._lh_vol, np.zeros(grow, np.float64)))
+            self._lh_count = np.concatenate((self._lh_count, np.zeros(grow, np.int32)))
+            self._lh_first_ts = np.concatenate((self._lh_first_ts, np.zeros(grow, np.int64)))
+            self._lh_last_ts = np.concatenate((self._lh_last_ts, np.zeros(grow, np.int64)))
+        row = self._lh_rows
+        self._lh_rows += 1
+        return row
+    
+    def _new_depth_row(self) -> int:
+        """Allocate a depth-history row, growing the arrays when full."""
+        row = len(self.level_depth_history)
+        if row == self._dh_head.shape[0]:
+            self._dh_depths = np.concatenate((self._dh_depths, np.zeros_like(self._dh_depths)))
+            self._dh_head = np.concatenate((self._dh_head, np.zeros(row, np.int64)))
+            self._dh_count = np.concatenate((self._dh_count, np.zeros(row, np.int64)))
+        return row
+    
+    def _to_tick(self, price: float) -> int:
+        """Integer price-level key; rounds to the nearest tick so 0.29 * 100 maps to 29."""
+        return int(price * self.tick_scale + 0.5)
+    
+    def _level_row(self, tick: int) -> int:
+        """Row of a traded price level, or -1 if it is not tracked."""
+        return self.level_hits.get(tick, -1)
+    
     def _clean_old_level_data(self, max_age_seconds: int = 60):
-        """Clean old level tracking data."""
-        cutoff = datetime.utcnow() - timedelta(seconds=max_age_seconds)
-        levels_to_remove = []
-        for price, data in self.level_hits.items():
-            data['timestamps'] = [t for t in data['timestamps'] if t > cutoff]
-            if not data['timestamps']:
-                levels_to_remove.append(price)
-        for price in levels_to_remove:
-            del self.level_hits[price]
+        """Drop levels that have not traded within the max age."""
+        self._trades_since_clean = 0
+        cutoff_ns = time.time_ns() - max_age_seconds * 1_000_000_000
+        stale = self._lh_last_ts <= cutoff_ns
+        stale_ticks = [tick for tick, row in self.level_hits.items() if stale[row]]
+        for tick in stale_ticks:
+            self._lh_free.append(self.level_hits.pop(tick))
     
     def _calculate_atr(self):
         """Calculate Average True Range."""
-        if len(self.high_prices) < 2:
+        if len(self._high) < 2:
             return
         
-        high = list(self.high_prices)
-        low = list(self.low_prices)
-        close = list(self.close_prices)
-        
-        tr_values = []
-        for i in range(1, len(high)):
-            tr = max(
-                high[i] - low[i],
-                abs(high[i] - close[i-1]),
-                abs(low[i] - close[i-1])
-            )
-            tr_values.append(tr)
-        
-        if tr_values:
-            atr = np.mean(tr_values[-self.atr_period:])
-            self.atr_values.append(atr)
-            if len(self.atr_values) > 10:
-                self.median_atr = np.median(list(self.atr_values))
+        # Only the last atr_period true ranges are averaged
+        n = min(len(self._high), self.atr_period + 1)
+        high = self._high.view()[-n:]
+        low = self._low.view()[-n:]
+        close = self._close.view()[-n:]
+        
+        prev_close = close[:-1]
+        tr = np.maximum(
+            high[1:] - low[1:],
+            np.maximum(np.abs(high[1:] - prev_close), np.abs(low[1:] - prev_close))
+        )
+        
+        atr = tr.mean()
+        self.atr_values.append(atr)
+        if len(self.atr_values) > 10:
+            self.median_atr = self.atr_values.median()
     
     def get_current_atr(self) -> float:
         """Get current ATR value."""
         if self.atr_values:
-            return self.atr_values[-1]
+            return self.atr_values.last()
         return 0.01  # Default small value
     
     # ==================== DELTA & IMBALANCE MODEL ====================
     
-    def calculate_delta_metrics(self, window_ms: int = 1000) -> DeltaMetrics:
+    def calculate_delta_metrics(self, window_ms: int = 1000, now_ns: Optional[int] = None) -> DeltaMetrics:
         """Calculate delta and imbalance metrics.
         
         Formulas:
@@ -185,19 +383,21 @@ class AnalyticsEngine:
         - Normalized: Δ_norm(t) = (V_buy - V_sell) / (V_buy + V_sell + ε)
         - Depth-aware: Δ_depth(t) = (V_buy - V_sell) / (D_bid + D_ask + ε)
         """
-        cutoff = datetime.utcnow() - timedelta(milliseconds=window_ms)
-        recent_trades = [t for t in self.trades if t.timestamp > cutoff]
-        
-        v_buy = sum(t.quantity for t in recent_trades if not t.is_buyer_maker)
-        v_sell = sum(t.quantity for t in recent_trades if t.is_buyer_maker)
-        
-        # Get current depth
-        d_bid, d_ask = 0.0, 0.0
-        if self.order_books:
-            ob = self.order_books[-1]
-            d_bid = sum(l.quantity for l in ob.bids[:5])  # Top 5 levels
-            d_ask = sum(l.quantity for l in ob.asks[:5])
+        if now_ns is None:
+            now_ns = time.time_ns()
+        v_buy, v_sell, _ = self._trade_window(window_ms, now_ns)
         
+        # Current depth over the top 5 levels
+        return self._delta_from_window(v_buy, v_sell, self._top5_bid_depth, self._top5_ask_depth)
+    
+    def _trade_window(self, window_ms: int, now_ns: int) -> Tuple[float, float, int]:
+        """Buy volume, sell volume and trade count over the trailing window."""
+        return window_delta(
+            self._trade_ts.view(), self._trade_qty.view(), self._trade_side.view(),
+            now_ns - window_ms * 1_000_000
+        )
+    
+    def _delta_from_window(self, v_buy: float, v_sell: float, d_bid: float, d_ask: float) -> DeltaMetrics:
         raw_delta = v_buy - v_sell
         normalized_delta = raw_delta / (v_buy + v_sell + self.EPSILON)
         depth_aware_delta = raw_delta / (d_bid + d_ask + self.EPSILON)
@@ -209,6 +409,60 @@ class AnalyticsEngine:
             cumulative_delta=self.cumulative_delta
         )
     
+    # ==================== BOOK LEVEL SWEEP ====================
+    
+    def _book_levels(self) -> Dict[str, np.ndarray]:
+        """Gather per-level inputs for the latest book's top 10 bids followed by its top 10 asks.
+        
+        Level hits, depth history and persistence are looked up once per
+        level here and shared by the absorption and iceberg models.
+        """
+        ticks = self._top_ticks
+        n_levels = len(ticks)
+        n_bids = self._top_n_bids
+        
+        rows = np.fromiter((self.level_hits.get(t, -1) for t in ticks), np.int64, n_levels)
+        tracked = rows >= 0
+        hits = np.where(tracked, self._lh_count[rows], 0)
+        duration = (self._lh_last_ts[rows] - self._lh_first_ts[rows]) / 1e9
+        v_hit = np.where(tracked, self._lh_vol[rows], 0.0)
+        
+        history = self.level_depth_history
+        depth_rows = np.fromiter((history.get(t, -1) for t in ticks), np.int64, n_levels)
+        refill, refill_freq = level_refill_stats(
+            self._dh_depths, self._dh_head, self._dh_count, depth_rows, self.EPSILON
+        )
+        
+        return {
+            'price': [t / self.tick_scale for t in ticks],
+            'qty': self._top_qty,
+            'is_bid': np.arange(n_levels) < n_bids,
+            'top5': np.concatenate((np.arange(n_bids) < 5, np.arange(n_levels - n_bids) < 5)),
+            'tracked': tracked,
+            'v_hit': v_hit,
+            'hidden': np.where(tracked, v_hit * refill_freq, 0.0),
+            'refill': refill,
+            'persist': np.where(hits >= 2, np.minimum(1.0, (duration * hits) / 60.0), 0.0),
+        }
+    
+    def _compute_all_metrics(self, now_ns: int, window_ms: int = 1000
+                             ) -> Tuple[DeltaMetrics, AbsorptionMetrics, IcebergMetrics, MomentumMetrics]:
+        """Delta, absorption, iceberg and momentum from one trade window and one book sweep."""
+        v_buy, v_sell, count = self._trade_window(window_ms, now_ns)
+        delta = self._delta_from_window(v_buy, v_sell, self._top5_bid_depth, self._top5_ask_depth)
+        
+        if self.order_book is None:
+            return (delta, AbsorptionMetrics(), IcebergMetrics(),
+                    self._momentum_from_window(delta, v_buy + v_sell, count, window_ms))
+        
+        levels = self._book_levels()
+        return (
+            delta,
+            self._absorption_from_levels(levels),
+            self._iceberg_from_levels(levels),
+            self._momentum_from_window(delta, v_buy + v_sell, count, window_ms)
+        )
+    
     # ==================== ABSORPTION DETECTION ====================
     
     def calculate_absorption_metrics(self, window_ms: int = 5000) -> AbsorptionMetrics:
@@ -218,62 +472,44 @@ class AnalyticsEngine:
         - AbsorptionScore(p,t) = V_hit(p,t) / (V_hit(p,t) + L_vis(p,t) + ε)
         - AbsorptionStrength(p,t) = (V_hit + L_res) / (V_hit + L_vis + L_res + ε)
         """
-        if not self.order_books:
+        if self.order_book is None:
             return AbsorptionMetrics()
         
-        ob = self.order_books[-1]
-        absorption_levels = []
-        max_bid_absorption = 0.0
-        max_ask_absorption = 0.0
-        
-        # Check bid levels (support)
-        for level in ob.bids[:10]:
-            price = round(level.price, 2)
-            if price in self.level_hits:
-                v_hit = self.level_hits[price]['volume']
-                l_vis = level.quantity
-                l_res = self._estimate_hidden_liquidity(price)
-                
-                score = v_hit / (v_hit + l_vis + self.EPSILON)
-                strength = (v_hit + l_res) / (v_hit + l_vis + l_res + self.EPSILON)
-                
-                if score > 0.3:  # Threshold for significant absorption
-                    absorption_levels.append({
-                        'price': price,
-                        'side': 'bid',
-                        'score': score,
-                        'strength': strength,
-                        'volume_hit': v_hit
-                    })
-                    max_bid_absorption = max(max_bid_absorption, strength)
-        
-        # Check ask levels (resistance)
-        for level in ob.asks[:10]:
-            price = round(level.price, 2)
-            if price in self.level_hits:
-                v_hit = self.level_hits[price]['volume']
-                l_vis = level.quantity
-                l_res = self._estimate_hidden_liquidity(price)
-                
-                score = v_hit / (v_hit + l_vis + self.EPSILON)
-                strength = (v_hit + l_res) / (v_hit + l_vis + l_res + self.EPSILON)
-                
-                if score > 0.3:
-                    absorption_levels.append({
-                        'price': price,
-                        'side': 'ask',
-                        'score': score,
-                        'strength': strength,
-                        'volume_hit': v_hit
-                    })
-                    max_ask_absorption = max(max_ask_absorption, strength)
+        return self._absorption_from_levels(self._book_levels())
+    
+    def _absorption_from_levels(self, levels: Dict[str, np.ndarray]) -> AbsorptionMetrics:
+        v_hit = levels['v_hit']
+        l_vis = levels['qty']
+        l_res = levels['hidden']
+        
+        score, strength = absorption_kernel(v_hit, l_vis, l_res, self.EPSILON)
+        
+        # Threshold for significant absorption; bids act as support, asks as resistance
+        significant = levels['tracked'] & (score > 0.3)
+        is_bid = levels['is_bid']
+        
+        absorption_levels = [
+            {
+                'price': levels['price'][i],
+                'side': 'bid' if is_bid[i] else 'ask',
+                'score': float(score[i]),
+                'strength': float(strength[i]),
+                'volume_hit': float(v_hit[i])
+            }
+            for i in np.flatnonzero(significant)
+        ]
+        
+        bid_mask = significant & is_bid
+        ask_mask = significant & ~is_bid
+        max_bid_absorption = float(strength[bid_mask].max()) if bid_mask.any() else 0.0
+        max_ask_absorption = float(strength[ask_mask].max()) if ask_mask.any() else 0.0
         
         # Overall absorption score
         overall_score = 0.0
         overall_strength = 0.0
         if absorption_levels:
-            overall_score = np.mean([l['score'] for l in absorption_levels])
-            overall_strength = np.mean([l['strength'] for l in absorption_levels])
+            overall_score = score[significant].mean()
+            overall_strength = strength[significant].mean()
         
         return AbsorptionMetrics(
             score=overall_score,
@@ -283,26 +519,32 @@ class AnalyticsEngine:
             absorption_levels=absorption_levels
         )
     
-    def _estimate_hidden_liquidity(self, price: float) -> float:
+    def _estimate_hidden_liquidity(self, tick: int) -> float:
         """Estimate hidden/iceberg liquidity at a price level."""
-        if price not in self.level_depth_history:
-            return 0.0
+        # Estimate hidden liquidity based on refill frequency
+        row = self._level_row(tick)
+        if row >= 0:
+            return self._lh_vol[row] * self._depth_refill_stats(tick)[1]
+        return 0.0
+    
+    def _depth_refill_stats(self, tick: int) -> Tuple[float, float]:
+        """Refill intensity and refill frequency from a level's depth history.
         
-        depths = self.level_depth_history[price]
-        if len(depths) < 3:
-            return 0.0
+        Intensity is refilled depth over consumed depth; frequency is the
+        share of snapshots where depth decreased then increased.
+        """
+        row = self.level_depth_history.get(tick)
+        if row is None:
+            return 0.0, 0.0
         
-        # Look for refill patterns (depth decreases then increases)
-        refills = 0
-        for i in range(2, len(depths)):
-            if depths[i-1] < depths[i-2] and depths[i] > depths[i-1]:
-                refills += 1
+        count = int(self._dh_count[row])
+        if count < 3:
+            return 0.0, 0.0
         
-        # Estimate hidden liquidity based on refill frequency
-        if price in self.level_hits:
-            v_hit = self.level_hits[price]['volume']
-            return v_hit * (refills / max(len(depths) - 2, 1))
-        return 0.0
+        refill_magnitude, consume_magnitude, refills = depth_refill_stats(
+            self._dh_depths[row], self._dh_head[row], count
+        )
+        return refill_magnitude / (consume_magnitude + self.EPSILON), refills / (count - 2)
     
     # ==================== ICEBERG DETECTION ====================
     
@@ -313,121 +555,95 @@ class AnalyticsEngine:
         IP(p,t) = σ(a0 + a1*FDR(p,t) + a2*R_refill(p,t) + a3*T_persist(p,t))
         where σ is logistic function
         """
-        if not self.order_books:
+        if self.order_book is None:
             return IcebergMetrics()
         
-        ob = self.order_books[-1]
-        detected_icebergs = []
-        max_probability = 0.0
-        
-        all_levels = [(l, 'bid') for l in ob.bids[:10]] + [(l, 'ask') for l in ob.asks[:10]]
-        
-        for level, side in all_levels:
-            price = round(level.price, 2)
-            
-            # Calculate FDR (Fill-to-Display Ratio)
-            v_exec = self.level_hits.get(price, {}).get('volume', 0)
-            l_disp = level.quantity
-            fdr = v_exec / (l_disp + self.EPSILON)
-            
-            # Calculate refill intensity
-            r_refill = self._calculate_refill_intensity(price)
-            
-            # Calculate persistence
-            t_persist = self._calculate_persistence(price)
-            
-            # Logistic model for iceberg probability
-            z = (self.iceberg_coeffs['a0'] + 
-                 self.iceberg_coeffs['a1'] * fdr +
-                 self.iceberg_coeffs['a2'] * r_refill +
-                 self.iceberg_coeffs['a3'] * t_persist)
-            
-            probability = 1 / (1 + math.exp(-z))  # Sigmoid
-            
-            if probability > 0.5:  # Threshold for iceberg detection
-                detected_icebergs.append({
-                    'price': price,
-                    'side': side,
-                    'probability': probability,
-                    'fdr': fdr,
-                    'estimated_hidden': v_exec - l_disp if v_exec > l_disp else 0
-                })
-                max_probability = max(max_probability, probability)
-        
-        # Simple IP calculation
-        v_exec_total = sum(self.level_hits.get(round(l.price, 2), {}).get('volume', 0) 
-                          for l in ob.bids[:5] + ob.asks[:5])
-        v_visible_total = sum(l.quantity for l in ob.bids[:5] + ob.asks[:5])
-        ip_simple = (v_exec_total - v_visible_total) / (v_exec_total + self.EPSILON) if v_exec_total > v_visible_total else 0
-        
+        return self._iceberg_from_levels(self._book_levels())
+    
+    def _iceberg_from_levels(self, levels: Dict[str, np.ndarray]) -> IcebergMetrics:
+        # FDR (Fill-to-Display Ratio)
+        v_exec = levels['v_hit']
+        l_disp = levels['qty']
+        fdr = v_exec / (l_disp + self.EPSILON)
+        
+        r_refill = levels['refill']
+        t_persist = levels['persist']
+        
+        # Logistic model for iceberg probability
+        probability = iceberg_kernel(fdr, r_refill, t_persist, self._a0, self._a1, self._a2, self._a3)
+        
+        # Threshold for iceberg detection
+        detected = probability > 0.5
+        is_bid = levels['is_bid']
+        detected_icebergs = [
+            {
+                'price': levels['price'][i],
+                'side': 'bid' if is_bid[i] else 'ask',
+                'probability': float(probability[i]),
+                'fdr': float(fdr[i]),
+                'estimated_hidden': float(v_exec[i] - l_disp[i]) if v_exec[i] > l_disp[i] else 0
+            }
+            for i in np.flatnonzero(detected)
+        ]
+        max_probability = float(probability[detected].max()) if detected_icebergs else 0.0
+        
+        # FDR reported is that of the last level scanned
+        top5 = levels['top5']
         return IcebergMetrics(
             probability=max_probability,
-            fill_to_display_ratio=fdr if detected_icebergs else 0,
-            refill_intensity=np.mean([self._calculate_refill_intensity(round(l.price, 2)) for l in ob.bids[:5] + ob.asks[:5]]),
-            persistence_score=np.mean([self._calculate_persistence(round(l.price, 2)) for l in ob.bids[:5] + ob.asks[:5]]),
+            fill_to_display_ratio=float(fdr[-1]) if detected_icebergs else 0,
+            refill_intensity=np.mean(r_refill[top5]),
+            persistence_score=np.mean(t_persist[top5]),
             detected_levels=detected_icebergs
         )
     
-    def _calculate_refill_intensity(self, price: float) -> float:
+    def _calculate_refill_intensity(self, tick: int) -> float:
         """Calculate normalized refill intensity at a price level."""
-        if price not in self.level_depth_history:
-            return 0.0
-        
-        depths = self.level_depth_history[price]
-        if len(depths) < 3:
-            return 0.0
-        
-        refill_magnitude = 0.0
-        consume_magnitude = 0.0
-        
-        for i in range(1, len(depths)):
-            diff = depths[i] - depths[i-1]
-            if diff > 0:
-                refill_magnitude += diff
-            else:
-                consume_magnitude += abs(diff)
-        
-        return refill_magnitude / (consume_magnitude + self.EPSILON)
+        return self._depth_refill_stats(tick)[0]
     
-    def _calculate_persistence(self, price: float) -> float:
+    def _calculate_persistence(self, tick: int) -> float:
         """Calculate how long a price level persists while being hit."""
-        if price not in self.level_hits:
+        row = self._level_row(tick)
+        if row < 0:
             return 0.0
         
-        timestamps = self.level_hits[price]['timestamps']
-        if len(timestamps) < 2:
+        hits = int(self._lh_count[row])
+        if hits < 2:
             return 0.0
         
         # Duration the level has been present while being traded
-        duration = (timestamps[-1] - timestamps[0]).total_seconds()
-        hits = len(timestamps)
+        duration = (self._lh_last_ts[row] - self._lh_first_ts[row]) / 1e9
         
         # Normalize: high persistence = long duration with many hits
         return min(1.0, (duration * hits) / 60.0)  # Normalize to 60 seconds
     
     # ==================== MOMENTUM BURST INDEX ====================
     
-    def calculate_momentum_metrics(self, window_ms: int = 1000) -> MomentumMetrics:
+    def calculate_momentum_metrics(self, window_ms: int = 1000, now_ns: Optional[int] = None) -> MomentumMetrics:
         """Calculate Order-Flow Momentum Burst Index.
         
         Formula:
         OFMBI(t) = Δ_norm(t) * TS(t) / (S(t) + ε)
         OFMBI_vol(t) = Δ_norm(t) * TS(t) / (S(t) * ATR_k(t) + ε)
         """
-        delta_metrics = self.calculate_delta_metrics(window_ms)
-        
+        if now_ns is None:
+            now_ns = time.time_ns()
+        delta_metrics = self.calculate_delta_metrics(window_ms, now_ns)
+        v_buy, v_sell, count = self._trade_window(window_ms, now_ns)
+        return self._momentum_from_window(delta_metrics, v_buy + v_sell, count, window_ms)
+    
+    def _momentum_from_window(self, delta_metrics: DeltaMetrics, volume: float, count: int,
+                              window_ms: int) -> MomentumMetrics:
         # Calculate tape speed (trades per second)
-        cutoff = datetime.utcnow() - timedelta(milliseconds=window_ms)
-        recent_trades = [t for t in self.trades if t.timestamp > cutoff]
-        tape_speed = len(recent_trades) / (window_ms / 1000.0) if window_ms > 0 else 0
+        tape_speed = count / (window_ms / 1000.0) if window_ms > 0 else 0
         
         # Volume velocity
-        volume_velocity = sum(t.quantity for t in recent_trades) / (window_ms / 1000.0) if recent_trades else 0
+        volume_velocity = volume / (window_ms / 1000.0) if count else 0
         
         # Get current spread
         spread = self.median_spread if self.median_spread > 0 else 0.01
-        if self.order_books:
-            spread = self.order_books[-1].spread
+        if self.current_spread is not None:
+            spread = self.current_spread
         
         # Calculate OFMBI
         ofmbi = (delta_metrics.normalized_delta * tape_speed) / (spread + self.EPSILON)
@@ -445,16 +661,21 @@ class AnalyticsEngine:
     
     # ==================== STRUCTURE & REGIME DETECTION ====================
     
-    def calculate_structure_metrics(self) -> StructureMetrics:
-        """Detect market structure, regime, and trendline rejection."""
+    def calculate_structure_metrics(self, now_ns: Optional[int] = None,
+                                    delta_normalized: Optional[float] = None) -> StructureMetrics:
+        """Detect market structure, regime, and trendline rejection.
+        
+        ``delta_normalized`` lets callers that already computed delta metrics
+        for the same window skip recomputing them for the rejection flow.
+        """
         if len(self.prices) < 20:
             return StructureMetrics()
         
-        prices = list(self.prices)
+        prices = self.prices.view()
         
         # Detect swing points
-        swing_highs = self._detect_swing_highs(prices)
-        swing_lows = self._detect_swing_lows(prices)
+        high_arr, low_arr = self._detect_swings(prices)
+        swing_highs, swing_lows = high_arr.tolist(), low_arr.tolist()
         
         # Determine trend direction
         trend = self._determine_trend(swing_highs, swing_lows)
@@ -466,7 +687,7 @@ class AnalyticsEngine:
         bos, choch = self._detect_structure_breaks(swing_highs, swing_lows, trend)
         
         # Calculate TRP
-        trp = self._calculate_trendline_rejection(prices, swing_highs, swing_lows)
+        trp = self._calculate_trendline_rejection(prices, high_arr, low_arr, now_ns, delta_normalized)
         
         return StructureMetrics(
             regime=regime,
@@ -480,21 +701,10 @@ class AnalyticsEngine:
             trendline_rejection_probability=trp
         )
     
-    def _detect_swing_highs(self, prices: List[float], lookback: int = 5) -> List[float]:
-        """Detect swing high points."""
-        swing_highs = []
-        for i in range(lookback, len(prices) - lookback):
-            if prices[i] == max(prices[i-lookback:i+lookback+1]):
-                swing_highs.append(prices[i])
-        return swing_highs
-    
-    def _detect_swing_lows(self, prices: List[float], lookback: int = 5) -> List[float]:
-        """Detect swing low points."""
-        swing_lows = []
-        for i in range(lookback, len(prices) - lookback):
-            if prices[i] == min(prices[i-lookback:i+lookback+1]):
-                swing_lows.append(prices[i])
-        return swing_lows
+    def _detect_swings(self, prices: np.ndarray, lookback: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        """Detect swing high and swing low points."""
+        is_high, is_low = swing_extrema(prices, lookback)
+        return prices[is_high], prices[is_low]
     
     def _determine_trend(self, highs: List[float], lows: List[float]) -> str:
         """Determine trend based on higher highs/lows vs lower highs/lows."""
@@ -515,22 +725,16 @@ class AnalyticsEngine:
             return "down"
         return "neutral"
     
-    def _detect_regime(self, prices: List[float]) -> MarketRegime:
+    def _detect_regime(self, prices: np.ndarray) -> MarketRegime:
         """Detect market regime using volatility and directional persistence."""
         if len(prices) < 20:
             return MarketRegime.RANGE
         
-        returns = np.diff(prices) / np.array(prices[:-1])
-        volatility = np.std(returns)
-        
-        # Directional persistence (autocorrelation of returns)
-        if len(returns) > 1:
-            persistence = np.corrcoef(returns[:-1], returns[1:])[0, 1]
-        else:
-            persistence = 0
+        # Volatility and directional persistence (autocorrelation of returns)
+        volatility, mean_abs_return, persistence = regime_stats(prices)
         
         # High volatility spike
-        if volatility > np.mean(np.abs(returns)) * 3:
+        if volatility > mean_abs_return * 3:
             return MarketRegime.SPIKE
         
         # Trending (high persistence)
@@ -551,63 +755,64 @@ class AnalyticsEngine:
         if len(self.prices) < 3:
             return bos, choch
         
-        current_price = self.prices[-1]
+        current_price = self.prices.last()
         
         # BOS: Price breaks recent structure in trend direction
         if trend == "up" and highs:
-            if current_price > max(highs[-3:]) if len(highs) >= 3 else highs[-1]:
-                bos = True
+            ref_high = max(highs[-3:]) if len(highs) >= 3 else highs[-1]
+            bos = bool(current_price > ref_high)
         elif trend == "down" and lows:
-            if current_price < min(lows[-3:]) if len(lows) >= 3 else lows[-1]:
-                bos = True
+            ref_low = min(lows[-3:]) if len(lows) >= 3 else lows[-1]
+            bos = bool(current_price < ref_low)
         
         # CHOCH: Price breaks structure against trend
         if trend == "up" and lows:
-            if current_price < min(lows[-2:]) if len(lows) >= 2 else lows[-1]:
-                choch = True
+            ref_low = min(lows[-2:]) if len(lows) >= 2 else lows[-1]
+            choch = bool(current_price < ref_low)
         elif trend == "down" and highs:
-            if current_price > max(highs[-2:]) if len(highs) >= 2 else highs[-1]:
-                choch = True
+            ref_high = max(highs[-2:]) if len(highs) >= 2 else highs[-1]
+            choch = bool(current_price > ref_high)
         
         return bos, choch
     
-    def _calculate_trendline_rejection(self, prices: List[float], highs: List[float], lows: List[float]) -> float:
+    def _calculate_trendline_rejection(self, prices: np.ndarray, highs: np.ndarray, lows: np.ndarray,
+                                       now_ns: Optional[int] = None,
+                                       delta_normalized: Optional[float] = None) -> float:
         """Calculate Trendline Rejection Probability.
         
         Formula:
         TRP_dist(t) = 1 - min(1, |Price(t) - T(t)| / (λ * ATR_k(t) + ε))
         TRP(t) = TRP_dist(t) * σ(b0 + b1 * RejFlow(t))
         """
-        if not prices:
+        if len(prices) == 0:
             return 0.0
         
         current_price = prices[-1]
         atr = self.get_current_atr()
-        lambda_param = self.trp_coeffs['lambda']
-        
-        # Find nearest trendline level
-        trendline_level = None
-        min_distance = float('inf')
+        lambda_param = self._lambda
         
-        for level in highs[-3:] + lows[-3:]:
-            distance = abs(current_price - level)
-            if distance < min_distance:
-                min_distance = distance
-                trendline_level = level
-        
-        if trendline_level is None:
+        # Find nearest trendline level (first one wins on ties)
+        levels = np.concatenate((highs[-3:], lows[-3:]))
+        if len(levels) == 0:
             return 0.0
         
+        distances = np.abs(current_price - levels)
+        nearest = distances.argmin()
+        min_distance = float(distances[nearest])
+        trendline_level = levels[nearest]
+        
         # Calculate TRP_dist
         distance_normalized = min_distance / (lambda_param * atr + self.EPSILON)
         trp_dist = 1 - min(1, distance_normalized)
         
         # Get rejection flow (delta against breakout direction)
-        delta = self.calculate_delta_metrics().normalized_delta
+        delta = delta_normalized
+        if delta is None:
+            delta = self.calculate_delta_metrics(now_ns=now_ns).normalized_delta
         rej_flow = -delta if current_price > trendline_level else delta
         
         # Apply logistic transform
-        z = self.trp_coeffs['b0'] + self.trp_coeffs['b1'] * rej_flow
+        z = self._b0 + self._b1 * rej_flow
         rej_factor = 1 / (1 + math.exp(-z))
         
         return trp_dist * rej_factor
@@ -616,43 +821,52 @@ class AnalyticsEngine:
     
     def calculate_liquidity_metrics(self) -> LiquidityMetrics:
         """Analyze liquidity structure and key zones."""
-        if not self.order_books or not self.prices:
+        if self.order_book is None or not self.prices:
             return LiquidityMetrics()
         
-        ob = self.order_books[-1]
-        prices = list(self.prices)
-        volumes = list(self.volumes)
+        ob = self.order_book
+        prices = self.prices.view()
+        # Trade quantities are appended in step with prices, so their tails line up
+        volumes = self._trade_qty.view()
         
         # Calculate VWAP
-        if volumes:
-            vwap = sum(p * v for p, v in zip(prices[-100:], volumes[-100:])) / (sum(volumes[-100:]) + self.EPSILON)
+        if len(volumes):
+            tail_px = prices[-100:]
+            tail_vol = volumes[-100:]
+            vwap = float(tail_px @ tail_vol) / (float(tail_vol.sum()) + self.EPSILON)
         else:
-            vwap = prices[-1] if prices else 0
+            vwap = prices[-1] if len(prices) else 0
         
         # Identify liquidity zones (high depth areas)
         liquidity_zones = []
-        for level in ob.bids[:20] + ob.asks[:20]:
-            if level.quantity > np.mean([l.quantity for l in ob.bids[:10] + ob.asks[:10]]) * 1.5:
-                liquidity_zones.append({
-                    'price': level.price,
-                    'quantity': level.quantity,
-                    'type': 'support' if level in ob.bids else 'resistance'
-                })
+        if len(self._top_qty):
+            threshold = self._top_qty.mean() * 1.5
+            liquidity_zones = []
+            for px, qty, zone_type in ((ob.bid_px[:20], ob.bid_qty[:20], 'support'),
+                                       (ob.ask_px[:20], ob.ask_qty[:20], 'resistance')):
+                deep = qty > threshold
+                liquidity_zones.extend(
+                    {'price': price, 'quantity': quantity, 'type': zone_type}
+                    for price, quantity in zip(px[deep].tolist(), qty[deep].tolist())
+                )
         
         # Volume profile (simplified)
         volume_profile = []
-        if prices and volumes:
-            price_bins = np.linspace(min(prices[-500:]), max(prices[-500:]), 20)
-            for i in range(len(price_bins) - 1):
-                vol_at_level = sum(v for p, v in zip(prices[-500:], volumes[-500:]) 
-                                  if price_bins[i] <= p < price_bins[i+1])
-                volume_profile.append({
-                    'price': (price_bins[i] + price_bins[i+1]) / 2,
-                    'volume': vol_at_level
-                })
+        if len(prices) and len(volumes):
+            px = prices[-500:]
+            vol = volumes[-500:]
+            price_bins = np.linspace(px.min(), px.max(), 20)
+            # Bins are half-open [lo, hi), so the window high falls outside the profile
+            bin_idx = np.searchsorted(price_bins, px, side='right') - 1
+            in_range = bin_idx < len(price_bins) - 1
+            vol_at_level = np.bincount(bin_idx[in_range], weights=vol[in_range], minlength=len(price_bins) - 1)
+            mid = (price_bins[:-1] + price_bins[1:]) / 2
+            volume_profile = [
+                {'price': p, 'volume': v} for p, v in zip(mid.tolist(), vol_at_level.tolist())
+            ]
         
         # Premium/Discount zones
-        current_price = prices[-1] if prices else 0
+        current_price = prices[-1] if len(prices) else 0
         premium_zone = current_price > vwap * 1.002
         discount_zone = current_price < vwap * 0.998
         
@@ -671,25 +885,23 @@ class AnalyticsEngine:
         
         HFSS(t) = w1*Δ̃(t) + w2*AS̃(t) + w3*IP̃(t) + w4*OFMBĨ(t) + w5*Structurẽ(t) - w6*SpreadPeñ(t)
         """
-        # Calculate all metrics
-        delta = self.calculate_delta_metrics()
-        absorption = self.calculate_absorption_metrics()
-        iceberg = self.calculate_iceberg_metrics()
-        momentum = self.calculate_momentum_metrics()
-        structure = self.calculate_structure_metrics()
-        liquidity = self.calculate_liquidity_metrics()
+        # Calculate all metrics against a single clock reading
+        now_ns = time.time_ns()
+        delta, absorption, iceberg, momentum = self._compute_all_metrics(now_ns)
+        structure = self.calculate_structure_metrics(now_ns, delta.normalized_delta)
+        # Liquidity zones/profile don't feed the score; they are built only in get_all_metrics
         
-        # Normalize components to [-1, 1] or [0, 1]
-        delta_normalized = np.clip(delta.normalized_delta, -1, 1)
+        # Normalize components to [-1, 1] or [0, 1] (plain scalar clamps; np.clip on a Python float costs microseconds)
+        delta_normalized = min(max(delta.normalized_delta, -1.0), 1.0)
         
         # Absorption: positive for bid absorption (bullish), negative for ask absorption (bearish)
-        absorption_normalized = np.clip(absorption.bid_absorption - absorption.ask_absorption, -1, 1)
+        absorption_normalized = min(max(absorption.bid_absorption - absorption.ask_absorption, -1.0), 1.0)
         
         # Iceberg: directional based on where icebergs detected
         iceberg_normalized = iceberg.probability * 0.5  # Scale down
         
         # OFMBI: already directional
-        ofmbi_normalized = np.clip(momentum.ofmbi / 100, -1, 1)  # Scale
+        ofmbi_normalized = min(max(momentum.ofmbi / 100, -1.0), 1.0)  # Scale
         
         # Structure factor
         structure_factor = 0.0
@@ -706,8 +918,8 @@ class AnalyticsEngine:
         
         # Spread penalty
         spread_penalty = 0.0
-        if self.order_books and self.median_spread > 0:
-            current_spread = self.order_books[-1].spread
+        if self.current_spread is not None and self.median_spread > 0:
+            current_spread = self.current_spread
             atr = self.get_current_atr()
             spread_penalty = (current_spread / self.median_spread) * (atr / (self.median_atr + self.EPSILON))
             spread_penalty = min(spread_penalty, 1.0)
@@ -726,9 +938,14 @@ class AnalyticsEngine:
         # Scale HFSS to reasonable range for softmax
         scaled_hfss = hfss * 3  # Scale factor
         
-        exp_buy = math.exp(scaled_hfss)
-        exp_sell = math.exp(-scaled_hfss)
-        exp_none = math.exp(0)  # Neutral
+        # Logits are (s, -s, 0); shifting by max = |s| keeps every term <= 1
+        # and needs a single exp: exp(s - |s|), exp(-s - |s|), exp(-|s|)
+        t = math.exp(-abs(scaled_hfss))
+        if scaled_hfss >= 0:
+            exp_buy, exp_sell = 1.0, t * t
+        else:
+            exp_buy, exp_sell = t * t, 1.0
+        exp_none = t  # Neutral
         
         total = exp_buy + exp_sell + exp_none
         p_buy = exp_buy / total
@@ -761,7 +978,7 @@ class AnalyticsEngine:
         if structure.choch_detected:
             reasons.append("Structure: Change of character")
         
-        current_price = self.prices[-1] if self.prices else 0
+        current_price = self.prices.last() if len(self.prices) else 0
         
         return TradingSignal(
             symbol=symbol,
@@ -784,12 +1001,24 @@ class AnalyticsEngine:
         )
     
     def get_all_metrics(self) -> Dict:
-        """Get all current metrics for display."""
-        return {
-            'delta': self.calculate_delta_metrics().dict(),
-            'absorption': self.calculate_absorption_metrics().dict(),
-            'iceberg': self.calculate_iceberg_metrics().dict(),
-            'momentum': self.calculate_momentum_metrics().dict(),
-            'structure': self.calculate_structure_metrics().dict(),
+        """Get all current metrics for display.
+        
+        Callers share the returned dict: it is reused until new data arrives
+        or METRICS_MAX_AGE_NS passes, since the trailing windows move with time.
+        """
+        now_ns = time.time_ns()
+        if (not self._metrics_dirty and self._metrics_cache is not None
+                and now_ns - self._metrics_ns < self.METRICS_MAX_AGE_NS):
+            return self._metrics_cache
+        delta, absorption, iceberg, momentum = self._compute_all_metrics(now_ns)
+        self._metrics_cache = {
+            'delta': delta.dict(),
+            'absorption': absorption.dict(),
+            'iceberg': iceberg.dict(),
+            'momentum': momentum.dict(),
+            'structure': self.calculate_structure_metrics(now_ns, delta.normalized_delta).dict(),
             'liquidity': self.calculate_liquidity_metrics().dict()
         }
+        self._metrics_ns = now_ns
+        self._metrics_dirty = False
+        return self._metrics_cache
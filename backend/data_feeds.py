@@ -5,27 +5,166 @@ Binance: Uses public WebSocket API with testnet fallback
 Simulated: Generates realistic test data
 """
 import asyncio
+import heapq
+import importlib.util
 import json
-import random
 import math
-from datetime import datetime
-from typing import Optional, Callable, Dict, List, Any
+import random
+import time
+from itertools import chain, islice
+from typing import Optional, Callable, Awaitable, List, Tuple, Any, Literal
 import logging
+import numpy as np
 import websockets
 import httpx
-from models import Trade, OrderBook, OrderBookLevel, DataSource
+from models import OrderBook, DataSource
+from rolling import TradeRingBuffer
+from _jit import simulate_batch, simulate_book, simulate_xauusd_batch
 
 logger = logging.getLogger(__name__)
 
-# Try to import async_rithmic
+# Try to import orjson for faster decoding of WebSocket frames and REST bodies
 try:
-    from async_rithmic import RithmicClient, DataType, LastTradePresenceBits, BestBidOfferPresenceBits
-    RITHMIC_AVAILABLE = True
+    from orjson import loads as json_loads
 except ImportError:
-    RITHMIC_AVAILABLE = False
+    json_loads = json.loads
+
+# Try to import msgspec to decode Binance frames straight into typed structs
+try:
+    import msgspec
+    MSGSPEC_AVAILABLE = True
+except ImportError:
+    MSGSPEC_AVAILABLE = False
+
+if MSGSPEC_AVAILABLE:
+    class AggTradeMsg(msgspec.Struct):
+        s: str
+        p: float
+        q: float
+        T: int
+        m: bool
+        a: int
+    
+    class DepthUpdateMsg(msgspec.Struct):
+        s: str
+        E: int
+        b: List[Tuple[float, float]]
+        a: List[Tuple[float, float]]
+    
+    class PartialDepthMsg(msgspec.Struct):
+        """depth20 frames, which carry no event type."""
+        bids: List[Tuple[float, float]]
+        asks: List[Tuple[float, float]]
+    
+    class _SymbolInfo(msgspec.Struct):
+        symbol: str
+        status: str = ""
+        quoteAsset: str = ""
+    
+    class _ExchangeInfo(msgspec.Struct):
+        symbols: List[_SymbolInfo] = []
+    
+    # strict=False parses Binance's numeric strings ("p": "1.23") into floats
+    _agg_trade_decoder = msgspec.json.Decoder(AggTradeMsg, strict=False)
+    _depth_update_decoder = msgspec.json.Decoder(DepthUpdateMsg, strict=False)
+    _depth_decoder = msgspec.json.Decoder(PartialDepthMsg, strict=False)
+    _exchange_info_decoder = msgspec.json.Decoder(_ExchangeInfo)
+
+# Check for async_rithmic; it is only imported once a Rithmic feed connects
+RITHMIC_AVAILABLE = importlib.util.find_spec("async_rithmic") is not None
+if not RITHMIC_AVAILABLE:
     logger.warning("async_rithmic not installed. Rithmic feed will use simulation mode.")
 
 
+def _import_rithmic():
+    """Bind the async_rithmic names used by RithmicFeed at module level."""
+    global RithmicClient, DataType, LastTradePresenceBits, BestBidOfferPresenceBits
+    from async_rithmic import RithmicClient, DataType, LastTradePresenceBits, BestBidOfferPresenceBits
+
+
+# Shared REST client so repeated calls reuse pooled keep-alive connections
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the module-wide httpx client, creating it on first use."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(timeout=15.0)
+    return _http_client
+
+
+async def close_http_client():
+    """Close the shared httpx client (called on app shutdown)."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def _fill_levels(levels, px: np.ndarray, qty: np.ndarray) -> int:
+    """Copy [[price, quantity], ...] pairs (numbers or numeric strings) into
+    preallocated price and quantity columns, keeping their order.
+    
+    Pairs beyond the column capacity are dropped; returns the number of
+    levels written. One float() pass over the flattened pairs feeding
+    np.fromiter is ~20% faster than np.array's own string conversion for a
+    20-level side.
+    """
+    n = min(len(levels), len(px))
+    flat = np.fromiter(map(float, chain.from_iterable(islice(levels, n))), np.float64, 2 * n)
+    px[:n] = flat[0::2]
+    qty[:n] = flat[1::2]
+    return n
+
+
+def _sorted_columns(px: np.ndarray, qty: np.ndarray, descending: bool) -> Tuple[np.ndarray, np.ndarray]:
+    """Copies of price/quantity columns ordered by price, for feeds without
+    a level order guarantee."""
+    order = np.argsort(-px if descending else px, kind='stable')
+    return px[order], qty[order]
+
+
+class LatestWins:
+    """Latest-wins handoff from a feed to a slower async consumer.
+    
+    ``submit`` never blocks: it replaces any value the worker task has not
+    picked up yet, so when the consumer backs up, stale order book states
+    are dropped instead of queueing behind fresh ones.
+    """
+    
+    def __init__(self, callback: Callable[[Any], Awaitable]):
+        self._callback = callback
+        self._pending = None
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+    
+    def submit(self, value):
+        """Hand over the newest value, replacing one still waiting."""
+        self._pending = value
+        self._ready.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+    
+    async def _run(self):
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            value, self._pending = self._pending, None
+            try:
+                await self._callback(value)
+            except Exception as e:
+                logger.error("Error in order book consumer: %s", e)
+    
+    def cancel(self):
+        """Stop the worker and drop any pending value."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._pending = None
+        self._ready.clear()
+
+
 class BinanceFeed:
     """Binance WebSocket feed for cryptocurrency data.
     
@@ -48,12 +187,29 @@ class BinanceFeed:
         "LINKUSDT", "LTCUSDT", "UNIUSDT", "ATOMUSDT", "XLMUSDT"
     ]
     
+    # Max trades decoded from buffered frames before on_trade is invoked
+    MAX_TRADE_BATCH = 64
+    
+    # Levels kept per book side (the stream is depth20)
+    BOOK_DEPTH = 20
+    
     def __init__(self):
         self.ws: Optional[websockets.WebSocketClientProtocol] = None
         self.is_connected = False
         self.symbol = "btcusdt"
-        self.on_trade: Optional[Callable] = None
+        self._symbol_upper = "BTCUSDT"  # Cached display form of self.symbol
+        self.on_trade: Optional[Callable] = None  # on_trade(symbol, trades: TradeRingBuffer)
+        self.trades = TradeRingBuffer()
         self.on_order_book: Optional[Callable] = None
+        self._books = LatestWins(lambda book: self.on_order_book(book))
+        # Single book refilled in place for every depth update
+        self._book_px = np.empty((2, self.BOOK_DEPTH))
+        self._book_qty = np.empty((2, self.BOOK_DEPTH))
+        self._book = OrderBook(
+            symbol=self._symbol_upper, timestamp=0,
+            bid_px=self._book_px[0], bid_qty=self._book_qty[0],
+            ask_px=self._book_px[1], ask_qty=self._book_qty[1]
+        )
         self.on_connection_change: Optional[Callable] = None
         self._running = False
         self._reconnect_delay = 1
@@ -63,36 +219,49 @@ class BinanceFeed:
     async def connect(self, symbol: str = "btcusdt"):
         """Connect to Binance WebSocket streams."""
         self.symbol = symbol.lower()
+        self._symbol_upper = symbol.upper()
         self._running = True
         
+        # Stream URLs per endpoint (keyed by the testnet flag), built once per connect
+        streams = f"{self.symbol}@aggTrade/{self.symbol}@depth20@100ms"
+        stream_urls = {
+            False: f"{self.WEBSOCKET_URL}/{streams}",
+            True: f"{self.TESTNET_WEBSOCKET_URL}/{streams}"
+        }
+        
         while self._running:
             try:
                 # Choose endpoint based on testnet flag
-                base_url = self.TESTNET_WEBSOCKET_URL if self._use_testnet else self.WEBSOCKET_URL
-                stream_url = f"{base_url}/{self.symbol}@aggTrade/{self.symbol}@depth20@100ms"
+                stream_url = stream_urls[self._use_testnet]
                 
-                logger.info(f"Connecting to Binance {'testnet' if self._use_testnet else 'mainnet'} for {self.symbol.upper()}")
+                logger.info("Connecting to Binance %s for %s", "testnet" if self._use_testnet else "mainnet", self._symbol_upper)
                 
-                async with websockets.connect(stream_url, ping_interval=20, ping_timeout=10) as ws:
+                # Small JSON frames: skip permessage-deflate and cap frame size at 1 MiB
+                async with websockets.connect(
+                    stream_url, compression=None, max_size=2**20, ping_interval=20, ping_timeout=10
+                ) as ws:
                     self.ws = ws
                     self.is_connected = True
                     self._reconnect_delay = 1
                     
                     if self.on_connection_change:
-                        await self.on_connection_change(True, self.symbol.upper())
+                        await self.on_connection_change(True, self._symbol_upper)
                     
-                    logger.info(f"Connected to Binance stream for {self.symbol.upper()}")
+                    logger.info("Connected to Binance stream for %s", self._symbol_upper)
                     
-                    async for message in ws:
-                        if not self._running:
-                            break
-                        await self._handle_message(json.loads(message))
+                    while self._running:
+                        await self._handle_frame(await ws.recv(decode=False))
+                        
+                        # Keep decoding frames that are already buffered and hand
+                        # the accumulated trades over once per burst
+                        if len(self.trades) >= self.MAX_TRADE_BATCH or not self._frames_pending(ws):
+                            await self._flush_trades()
                         
             except websockets.exceptions.ConnectionClosed as e:
-                logger.warning(f"Binance connection closed: {e}")
+                logger.warning("Binance connection closed: %s", e)
             except Exception as e:
                 error_str = str(e)
-                logger.error(f"Binance connection error: {e}")
+                logger.error("Binance connection error: %s", e)
                 
                 # Check for geographic restriction (451 error)
                 if "451" in error_str or "restricted" in error_str.lower():
@@ -103,69 +272,114 @@ class BinanceFeed:
             finally:
                 self.is_connected = False
                 if self.on_connection_change:
-                    await self.on_connection_change(False, self.symbol.upper())
+                    await self.on_connection_change(False, self._symbol_upper)
             
             if self._running:
-                await asyncio.sleep(self._reconnect_delay)
+                # Jittered backoff so clients dropped together don't reconnect in lockstep
+                await asyncio.sleep(self._reconnect_delay * (0.5 + random.random()))
                 self._reconnect_delay = min(self._reconnect_delay * 2, self._max_reconnect_delay)
     
-    async def _handle_message(self, data: Dict):
-        """Handle incoming WebSocket message."""
+    async def _handle_frame(self, raw: bytes):
+        """Dispatch one raw WebSocket frame on its leading bytes, then decode it.
+        
+        Binance sends compact JSON with the discriminating key first, so the
+        frame kind is known before any parsing and only the matching decoder
+        runs; anything else (subscription acks, errors) is dropped undecoded.
+        """
+        head = raw[:64]
         try:
-            if 'e' in data:
-                event_type = data['e']
-                
-                if event_type == 'aggTrade':
-                    trade = Trade(
-                        symbol=data['s'],
-                        price=float(data['p']),
-                        quantity=float(data['q']),
-                        timestamp=datetime.fromtimestamp(data['T'] / 1000),
-                        is_buyer_maker=data['m'],
-                        trade_id=str(data['a'])
-                    )
-                    if self.on_trade:
-                        await self.on_trade(trade)
-                
-                elif event_type == 'depthUpdate':
-                    bids = [OrderBookLevel(price=float(b[0]), quantity=float(b[1])) for b in data['b']]
-                    asks = [OrderBookLevel(price=float(a[0]), quantity=float(a[1])) for a in data['a']]
-                    
-                    if bids and asks:
-                        order_book = OrderBook(
-                            symbol=data['s'],
-                            timestamp=datetime.fromtimestamp(data['E'] / 1000),
-                            bids=sorted(bids, key=lambda x: x.price, reverse=True),
-                            asks=sorted(asks, key=lambda x: x.price),
-                            best_bid=bids[0].price if bids else 0,
-                            best_ask=asks[0].price if asks else 0,
-                            spread=asks[0].price - bids[0].price if bids and asks else 0,
-                            mid_price=(bids[0].price + asks[0].price) / 2 if bids and asks else 0
-                        )
-                        if self.on_order_book:
-                            await self.on_order_book(order_book)
-            
-            # Handle depth snapshot format
-            elif 'bids' in data and 'asks' in data:
-                bids = [OrderBookLevel(price=float(b[0]), quantity=float(b[1])) for b in data['bids'][:20]]
-                asks = [OrderBookLevel(price=float(a[0]), quantity=float(a[1])) for a in data['asks'][:20]]
-                
-                if bids and asks:
-                    order_book = OrderBook(
-                        symbol=self.symbol.upper(),
-                        timestamp=datetime.utcnow(),
-                        bids=sorted(bids, key=lambda x: x.price, reverse=True),
-                        asks=sorted(asks, key=lambda x: x.price),
-                        best_bid=bids[0].price if bids else 0,
-                        best_ask=asks[0].price if asks else 0,
-                        spread=asks[0].price - bids[0].price if bids and asks else 0,
-                        mid_price=(bids[0].price + asks[0].price) / 2 if bids and asks else 0
-                    )
-                    if self.on_order_book:
-                        await self.on_order_book(order_book)
+            # Partial depth (depth20) frames carry no event type
+            if b'"lastUpdateId"' in head:
+                await self._handle_snapshot(raw)
+            elif b'"e":"aggTrade"' in head:
+                self._handle_trade(raw)
+            elif b'"e":"depthUpdate"' in head:
+                await self._handle_depth(raw)
                         
         except Exception as e:
-            logger.error(f"Error handling Binance message: {e}")
+            logger.error("Error handling Binance message: %s", e)
+    
+    def _handle_trade(self, raw: bytes):
+        """aggTrade event: dispatched by _flush_trades once the buffered frames are drained."""
+        if MSGSPEC_AVAILABLE:
+            msg = _agg_trade_decoder.decode(raw)
+            self.trades.push(msg.p, msg.q, msg.T * 1_000_000, msg.m, msg.a)
+        else:
+            data = json_loads(raw)
+            self.trades.push(
+                float(data['p']), float(data['q']), data['T'] * 1_000_000, data['m'], data['a']
+            )
+    
+    async def _handle_depth(self, raw: bytes):
+        """depthUpdate event."""
+        if MSGSPEC_AVAILABLE:
+            msg = _depth_update_decoder.decode(raw)
+            await self._emit_depth(msg.s, msg.E * 1_000_000, msg.b, msg.a)
+        else:
+            data = json_loads(raw)
+            await self._emit_depth(data['s'], data['E'] * 1_000_000, data['b'], data['a'])
+    
+    async def _handle_snapshot(self, raw: bytes):
+        """Depth snapshot format (already sorted; _emit_depth keeps the top BOOK_DEPTH levels)."""
+        if MSGSPEC_AVAILABLE:
+            msg = _depth_decoder.decode(raw)
+            bids, asks = msg.bids, msg.asks
+        else:
+            data = json_loads(raw)
+            bids, asks = data['bids'], data['asks']
+        await self._emit_depth(self._symbol_upper, time.time_ns(), bids, asks)
+    
+    async def _emit_depth(self, symbol: str, ts_ns: int, raw_bids: List, raw_asks: List):
+        """Refill the shared OrderBook from raw [price, qty] pairs (strings or floats) and dispatch it.
+        
+        Binance depth payloads already list bids descending and asks
+        ascending, so the wire order is kept as is.
+        """
+        if not (raw_bids and raw_asks):
+            return
+        
+        # Trades decoded before this book must reach the engine first, and the
+        # book may still be pending with the consumer, so only refill it now
+        await self._flush_trades()
+        
+        px, qty = self._book_px, self._book_qty
+        n_bids = _fill_levels(raw_bids, px[0], qty[0])
+        n_asks = _fill_levels(raw_asks, px[1], qty[1])
+        
+        book = self._book
+        book.bid_px = px[0, :n_bids]
+        book.bid_qty = qty[0, :n_bids]
+        book.ask_px = px[1, :n_asks]
+        book.ask_qty = qty[1, :n_asks]
+        if __debug__:
+            assert (np.diff(book.bid_px) < 0).all() and (np.diff(book.ask_px) > 0).all(), "unsorted depth levels"
+        
+        best_bid = float(px[0, 0])
+        best_ask = float(px[1, 0])
+        book.symbol = symbol
+        book.timestamp = ts_ns
+        book.best_bid = best_bid
+        book.best_ask = best_ask
+        book.spread = best_ask - best_bid
+        book.mid_price = (best_bid + best_ask) * 0.5
+        book.version += 1
+        if self.on_order_book:
+            self._books.submit(book)
+    
+    async def _flush_trades(self):
+        """Pass trades pushed since the last flush to on_trade in one call."""
+        if len(self.trades) and self.on_trade:
+            await self.on_trade(self._symbol_upper, self.trades)
+    
+    @staticmethod
+    def _frames_pending(ws) -> bool:
+        """Whether more frames are already buffered on the connection.
+        
+        Peeks at the websockets asyncio client's frame queue; when that is
+        unavailable every message is treated as the end of a burst.
+        """
+        recv_messages = getattr(ws, 'recv_messages', None)
+        return recv_messages is not None and len(recv_messages.frames) > 0
     
     async def change_symbol(self, new_symbol: str):
         """Change the trading symbol."""
@@ -176,6 +390,7 @@ class BinanceFeed:
     async def disconnect(self):
         """Disconnect from Binance."""
         self._running = False
+        self._books.cancel()
         if self.ws:
             await self.ws.close()
             self.ws = None
@@ -184,39 +399,55 @@ class BinanceFeed:
     @staticmethod
     async def get_exchange_info() -> List[str]:
         """Get list of available trading pairs."""
-        # Try testnet first (no geographic restrictions), then mainnet
+        # Probe testnet (no geographic restrictions) and mainnet concurrently,
+        # preferring testnet when both answer
         urls_to_try = [
             (BinanceFeed.TESTNET_REST_URL, "testnet"),
             (BinanceFeed.REST_URL, "mainnet")
         ]
         
-        for base_url, name in urls_to_try:
-            try:
-                url = f"{base_url}/exchangeInfo"
-                logger.info(f"Fetching symbols from Binance {name}: {url}")
-                
-                async with httpx.AsyncClient(timeout=15.0) as client:
-                    response = await client.get(url)
-                    
-                    if response.status_code == 451:
-                        logger.warning(f"Geographic restriction on Binance {name}")
-                        continue
-                    
-                    if response.status_code == 200:
-                        data = response.json()
-                        symbols = [s['symbol'] for s in data.get('symbols', []) 
-                                  if s.get('status') == 'TRADING' and s.get('quoteAsset') == 'USDT']
-                        if symbols:
-                            logger.info(f"Got {len(symbols)} symbols from Binance {name}")
-                            return sorted(symbols)[:50]
-                        
-            except Exception as e:
-                logger.error(f"Error fetching from Binance {name}: {e}")
-                continue
+        results = await asyncio.gather(
+            *(BinanceFeed._fetch_symbols(base_url, name) for base_url, name in urls_to_try)
+        )
+        for symbols in results:
+            if symbols:
+                return symbols
         
         # Return default symbols if all APIs fail
         logger.warning("All Binance APIs failed, using default symbol list")
         return BinanceFeed.DEFAULT_SYMBOLS
+    
+    @staticmethod
+    async def _fetch_symbols(base_url: str, name: str) -> Optional[List[str]]:
+        """Fetch USDT trading pairs from one REST endpoint, or None on failure."""
+        try:
+            url = f"{base_url}/exchangeInfo"
+            logger.info("Fetching symbols from Binance %s: %s", name, url)
+            
+            response = await get_http_client().get(url)
+            
+            if response.status_code == 451:
+                logger.warning("Geographic restriction on Binance %s", name)
+                return None
+            
+            if response.status_code == 200:
+                if MSGSPEC_AVAILABLE:
+                    # Typed decode skips building dicts for the large per-symbol filter lists
+                    info = _exchange_info_decoder.decode(response.content)
+                    symbols = [s.symbol for s in info.symbols
+                              if s.status == 'TRADING' and s.quoteAsset == 'USDT']
+                else:
+                    data = json_loads(response.content)
+                    symbols = [s['symbol'] for s in data.get('symbols', []) 
+                              if s.get('status') == 'TRADING' and s.get('quoteAsset') == 'USDT']
+                if symbols:
+                    logger.info("Got %d symbols from Binance %s", len(symbols), name)
+                    # Only the first 50 alphabetically are listed: O(n log 50) instead of a full sort
+                    return heapq.nsmallest(50, symbols)
+                    
+        except Exception as e:
+            logger.error("Error fetching from Binance %s: %s", name, e)
+        return None
 
 
 class RithmicFeed:
@@ -239,13 +470,21 @@ class RithmicFeed:
         self.server = "Rithmic Paper Trading"
         self.gateway = "TEST"
         self.gateway_url = ""
-        self.on_trade: Optional[Callable] = None
+        self.on_trade: Optional[Callable] = None  # on_trade(symbol, trades: TradeRingBuffer)
+        self.trades = TradeRingBuffer()
         self.on_order_book: Optional[Callable] = None
+        # on_top_of_book(symbol, best_bid, best_ask, bid_size, ask_size, ts_ns) for BBO updates
+        self.on_top_of_book: Optional[Callable] = None
+        self._books = LatestWins(lambda book: self.on_order_book(book))
+        self._tops = LatestWins(lambda top: self.on_top_of_book(*top))
         self.on_connection_change: Optional[Callable] = None
         self._running = False
         self._client = None
         self._symbol = "GC"  # Gold futures
         self._exchange = "COMEX"
+        # Scratch [price, size] rows for DOM updates; levels beyond the capacity are dropped
+        self._bid_buf = np.empty((2, 64))
+        self._ask_buf = np.empty((2, 64))
     
     async def connect(
         self, 
@@ -281,7 +520,8 @@ class RithmicFeed:
             return
         
         try:
-            logger.info(f"Connecting to Rithmic: {self.server} via {self.gateway_url}")
+            logger.info("Connecting to Rithmic: %s via %s", self.server, self.gateway_url)
+            _import_rithmic()
             
             # Create Rithmic client
             self._client = RithmicClient(
@@ -300,14 +540,14 @@ class RithmicFeed:
             if self.on_connection_change:
                 await self.on_connection_change(True, "XAUUSD")
             
-            logger.info(f"Connected to Rithmic ({server})")
+            logger.info("Connected to Rithmic (%s)", server)
             
             # Get front month gold contract
             try:
                 security_code = await self._client.get_front_month_contract(self._symbol, self._exchange)
-                logger.info(f"Streaming data for {security_code}")
+                logger.info("Streaming data for %s", security_code)
             except Exception as e:
-                logger.warning(f"Could not get front month contract: {e}. Using GCZ5")
+                logger.warning("Could not get front month contract: %s. Using GCZ5", e)
                 security_code = "GCZ5"  # Fallback
             
             # Set up callbacks
@@ -322,15 +562,15 @@ class RithmicFeed:
             try:
                 await self._client.subscribe_to_market_data(security_code, self._exchange, DataType.ORDER_BOOK)
             except Exception as e:
-                logger.warning(f"Order book subscription failed: {e}")
+                logger.warning("Order book subscription failed: %s", e)
             
             # Keep connection alive
             while self._running:
                 await asyncio.sleep(1)
                 
         except ConnectionResetError as e:
-            logger.error(f"Rithmic connection reset - this often happens when connecting from cloud/datacenter IPs.")
-            logger.error(f"Rithmic may block connections from non-residential IPs. Try running locally.")
+            logger.error("Rithmic connection reset - this often happens when connecting from cloud/datacenter IPs.")
+            logger.error("Rithmic may block connections from non-residential IPs. Try running locally.")
             logger.info("Falling back to simulated XAUUSD data")
             
             if self.on_connection_change:
@@ -338,7 +578,7 @@ class RithmicFeed:
             await self._simulate_xauusd_feed()
             
         except Exception as e:
-            logger.error(f"Rithmic connection error: {e}")
+            logger.error("Rithmic connection error: %s", e)
             logger.info("Falling back to simulation mode for XAUUSD")
             
             # Fall back to simulation
@@ -349,21 +589,21 @@ class RithmicFeed:
     async def _on_tick_received(self, data: dict):
         """Handle incoming tick data from Rithmic."""
         try:
-            if data.get("data_type") == DataType.LAST_TRADE:
+            data_type = data.get("data_type")
+            if data_type == DataType.LAST_TRADE:
                 if data.get("presence_bits", 0) & LastTradePresenceBits.LAST_TRADE:
-                    trade = Trade(
-                        symbol="XAUUSD",
-                        price=float(data.get("trade_price", 0)),
-                        quantity=float(data.get("trade_size", 1)),
-                        timestamp=datetime.utcnow(),
-                        is_buyer_maker=data.get("aggressor_side", "") == "S",
-                        trade_id=str(data.get("ssboe", ""))
+                    self.trades.push(
+                        float(data.get("trade_price", 0)),
+                        float(data.get("trade_size", 1)),
+                        time.time_ns(),
+                        data.get("aggressor_side", "") == "S",
+                        int(data.get("ssboe") or 0)
                     )
                     if self.on_trade:
-                        await self.on_trade(trade)
+                        await self.on_trade("XAUUSD", self.trades)
             
-            elif data.get("data_type") == DataType.BBO:
-                # Best bid/offer update - create order book with just top level
+            elif data_type == DataType.BBO:
+                # Best bid/offer update - passed on as scalars, no book is built
                 presence = data.get("presence_bits", 0)
                 
                 if presence & (BestBidOfferPresenceBits.BID | BestBidOfferPresenceBits.ASK):
@@ -372,137 +612,127 @@ class RithmicFeed:
                     bid_size = float(data.get("bid_size", 0))
                     ask_size = float(data.get("ask_size", 0))
                     
-                    if best_bid > 0 and best_ask > 0:
-                        order_book = OrderBook(
-                            symbol="XAUUSD",
-                            timestamp=datetime.utcnow(),
-                            bids=[OrderBookLevel(price=best_bid, quantity=bid_size)],
-                            asks=[OrderBookLevel(price=best_ask, quantity=ask_size)],
-                            best_bid=best_bid,
-                            best_ask=best_ask,
-                            spread=round(best_ask - best_bid, 2),
-                            mid_price=round((best_bid + best_ask) / 2, 2)
+                    # Quote bursts are coalesced like books: only the latest BBO is delivered
+                    if best_bid > 0 and best_ask > 0 and self.on_top_of_book:
+                        self._tops.submit(
+                            ("XAUUSD", best_bid, best_ask, bid_size, ask_size, time.time_ns())
                         )
-                        if self.on_order_book:
-                            await self.on_order_book(order_book)
                             
         except Exception as e:
-            logger.error(f"Error handling Rithmic tick: {e}")
+            logger.error("Error handling Rithmic tick: %s", e)
     
     async def _on_order_book_received(self, data: dict):
         """Handle order book updates from Rithmic."""
         try:
-            # Parse order book data
-            bids = []
-            asks = []
+            # Parse order book data: one pass bucketing levels into the scratch buffers
+            bid_buf = self._bid_buf
+            ask_buf = self._ask_buf
+            capacity = bid_buf.shape[1]
+            n_bids = n_asks = 0
             
             for level in data.get("levels", []):
-                level_data = OrderBookLevel(
-                    price=float(level.get("price", 0)),
-                    quantity=float(level.get("size", 0))
-                )
                 if level.get("side") == "B":
-                    bids.append(level_data)
+                    buf, i = bid_buf, n_bids
+                    n_bids += 1
                 else:
-                    asks.append(level_data)
+                    buf, i = ask_buf, n_asks
+                    n_asks += 1
+                if i < capacity:
+                    buf[0, i] = level.get("price", 0)
+                    buf[1, i] = level.get("size", 0)
             
-            if bids or asks:
-                bids = sorted(bids, key=lambda x: x.price, reverse=True)
-                asks = sorted(asks, key=lambda x: x.price)
+            if n_bids or n_asks:
+                n_bids = min(n_bids, capacity)
+                n_asks = min(n_asks, capacity)
+                bid_px, bid_qty = _sorted_columns(bid_buf[0, :n_bids], bid_buf[1, :n_bids], descending=True)
+                ask_px, ask_qty = _sorted_columns(ask_buf[0, :n_asks], ask_buf[1, :n_asks], descending=False)
                 
-                best_bid = bids[0].price if bids else 0
-                best_ask = asks[0].price if asks else 0
+                best_bid = float(bid_px[0]) if n_bids else 0
+                best_ask = float(ask_px[0]) if n_asks else 0
+                if best_bid and best_ask:
+                    spread = round(best_ask - best_bid, 2)
+                    mid_price = round((best_bid + best_ask) * 0.5, 2)
+                else:
+                    spread = mid_price = 0
                 
                 order_book = OrderBook(
                     symbol="XAUUSD",
-                    timestamp=datetime.utcnow(),
-                    bids=bids,
-                    asks=asks,
+                    timestamp=time.time_ns(),
+                    bid_px=bid_px,
+                    bid_qty=bid_qty,
+                    ask_px=ask_px,
+                    ask_qty=ask_qty,
                     best_bid=best_bid,
                     best_ask=best_ask,
-                    spread=round(best_ask - best_bid, 2) if best_bid and best_ask else 0,
-                    mid_price=round((best_bid + best_ask) / 2, 2) if best_bid and best_ask else 0
+                    spread=spread,
+                    mid_price=mid_price
                 )
                 if self.on_order_book:
-                    await self.on_order_book(order_book)
+                    self._books.submit(order_book)
                     
         except Exception as e:
-            logger.error(f"Error handling Rithmic order book: {e}")
+            logger.error("Error handling Rithmic order book: %s", e)
     
     async def _simulate_xauusd_feed(self):
         """Simulate XAUUSD tick data when Rithmic is unavailable."""
         base_price = 2350.0  # Base gold price
         volatility = 0.5
+        batch = 64  # Ticks generated per kernel call (~8s of simulated flow)
         
         self.is_connected = True
         
         while self._running:
             try:
-                # Generate realistic price movement
-                change = random.gauss(0, volatility)
-                base_price += change
-                base_price = max(base_price, 1800)  # Realistic gold floor
-                base_price = min(base_price, 2800)  # Realistic gold ceiling
-                
-                # Generate trade
-                trade = Trade(
-                    symbol="XAUUSD",
-                    price=round(base_price + random.uniform(-0.1, 0.1), 2),
-                    quantity=round(random.uniform(0.1, 10.0), 2),
-                    timestamp=datetime.utcnow(),
-                    is_buyer_maker=random.random() > 0.5,
-                    trade_id=str(random.randint(100000, 999999))
+                # Fresh buffers per batch: emitted books keep views into them
+                ticks = np.empty((batch, 6))
+                bid_px, bid_qty, ask_px, ask_qty = np.empty((4, batch, 20))
+                base_price = simulate_xauusd_batch(
+                    base_price, volatility, ticks, bid_px, bid_qty, ask_px, ask_qty
                 )
                 
-                if self.on_trade:
-                    await self.on_trade(trade)
-                
-                # Generate order book
-                spread = random.uniform(0.1, 0.3)
-                best_bid = round(base_price - spread / 2, 2)
-                best_ask = round(base_price + spread / 2, 2)
-                
-                bids = []
-                asks = []
-                for i in range(20):
-                    bids.append(OrderBookLevel(
-                        price=round(best_bid - i * 0.1, 2),
-                        quantity=round(random.uniform(1, 50), 2)
-                    ))
-                    asks.append(OrderBookLevel(
-                        price=round(best_ask + i * 0.1, 2),
-                        quantity=round(random.uniform(1, 50), 2)
-                    ))
-                
-                order_book = OrderBook(
-                    symbol="XAUUSD",
-                    timestamp=datetime.utcnow(),
-                    bids=bids,
-                    asks=asks,
-                    best_bid=best_bid,
-                    best_ask=best_ask,
-                    spread=spread,
-                    mid_price=round((best_bid + best_ask) / 2, 2)
-                )
-                
-                if self.on_order_book:
-                    await self.on_order_book(order_book)
-                
-                await asyncio.sleep(random.uniform(0.05, 0.2))
+                for i, (price, quantity, is_sell, trade_id, spread, sleep_s) in enumerate(ticks.tolist()):
+                    if not self._running:
+                        break
+                    
+                    self.trades.push(price, quantity, time.time_ns(), is_sell, int(trade_id))
+                    if self.on_trade:
+                        await self.on_trade("XAUUSD", self.trades)
+                    
+                    best_bid = float(bid_px[i, 0])
+                    best_ask = float(ask_px[i, 0])
+                    order_book = OrderBook(
+                        symbol="XAUUSD",
+                        timestamp=time.time_ns(),
+                        bid_px=bid_px[i],
+                        bid_qty=bid_qty[i],
+                        ask_px=ask_px[i],
+                        ask_qty=ask_qty[i],
+                        best_bid=best_bid,
+                        best_ask=best_ask,
+                        spread=spread,
+                        mid_price=round((best_bid + best_ask) * 0.5, 2)
+                    )
+                    
+                    if self.on_order_book:
+                        self._books.submit(order_book)
+                    
+                    await asyncio.sleep(sleep_s)
                 
             except Exception as e:
-                logger.error(f"Error in XAUUSD simulation: {e}")
+                logger.error("Error in XAUUSD simulation: %s", e)
                 await asyncio.sleep(1)
     
     async def disconnect(self):
         """Disconnect from Rithmic."""
         self._running = False
+        self._books.cancel()
+        self._tops.cancel()
         
         if self._client and RITHMIC_AVAILABLE:
             try:
                 await self._client.disconnect()
             except Exception as e:
-                logger.error(f"Error disconnecting from Rithmic: {e}")
+                logger.error("Error disconnecting from Rithmic: %s", e)
         
         self._client = None
         self.is_connected = False
@@ -512,21 +742,38 @@ class RithmicFeed:
 
 
 class SimulatedFeed:
-    """Simulated market data feed for testing without external connections."""
+    """Simulated market data feed for testing without external connections.
+    
+    ``sleep_mode="realtime"`` paces ticks with random 20-100ms sleeps;
+    ``"fast"`` generates back-to-back for benchmarks/backtests and only
+    yields to the event loop every FAST_YIELD_EVERY ticks.
+    """
+    
+    FAST_YIELD_EVERY = 128
+    TICK_BATCH = 256  # Ticks generated per kernel call
     
     def __init__(self):
         self.is_connected = False
         self.symbol = "SIMULATED"
-        self.on_trade: Optional[Callable] = None
+        self.on_trade: Optional[Callable] = None  # on_trade(symbol, trades: TradeRingBuffer)
+        self.trades = TradeRingBuffer()
         self.on_order_book: Optional[Callable] = None
+        self._books = LatestWins(lambda book: self.on_order_book(book))
         self.on_connection_change: Optional[Callable] = None
         self._running = False
         self._base_price = 100.0
+        self._sleep_mode: Literal["realtime", "fast"] = "realtime"
     
-    async def connect(self, symbol: str = "SIMULATED", base_price: float = 100.0):
+    async def connect(
+        self,
+        symbol: str = "SIMULATED",
+        base_price: float = 100.0,
+        sleep_mode: Literal["realtime", "fast"] = "realtime"
+    ):
         """Start simulated feed."""
         self.symbol = symbol
         self._base_price = base_price
+        self._sleep_mode = sleep_mode
         self._running = True
         self.is_connected = True
         
@@ -537,78 +784,64 @@ class SimulatedFeed:
     
     async def _generate_data(self):
         """Generate simulated market data with realistic patterns."""
-        trend = 0
-        trend_duration = 0
+        # [price, trend, trend_duration], advanced in place by simulate_batch
+        state = np.array([self._base_price, 0.0, 0.0])
+        ticks = np.empty((self.TICK_BATCH, 6))
+        fast = self._sleep_mode == "fast"
+        tick = 0
         
         while self._running:
             try:
-                # Change trend periodically
-                trend_duration += 1
-                if trend_duration > random.randint(50, 200):
-                    trend = random.choice([-1, 0, 1]) * random.uniform(0.01, 0.05)
-                    trend_duration = 0
+                simulate_batch(state, ticks)
                 
-                # Price movement
-                noise = random.gauss(0, 0.1)
-                self._base_price += trend + noise
-                self._base_price = max(self._base_price, 1)
-                
-                # Generate trade
-                volume = random.paretovariate(1.5)
-                is_buyer = random.random() > 0.5 + (trend * 2)
-                
-                trade = Trade(
-                    symbol=self.symbol,
-                    price=round(self._base_price, 4),
-                    quantity=round(min(volume, 100), 4),
-                    timestamp=datetime.utcnow(),
-                    is_buyer_maker=not is_buyer,
-                    trade_id=str(random.randint(1, 1000000))
-                )
-                
-                if self.on_trade:
-                    await self.on_trade(trade)
-                
-                # Generate order book every few trades
-                if random.random() > 0.7:
-                    spread = random.uniform(0.01, 0.05) * self._base_price / 100
-                    mid = self._base_price
+                for price, quantity, is_sell, trade_id, spread, sleep_s in ticks.tolist():
+                    if not self._running:
+                        break
+                    tick += 1
+                    self._base_price = price
                     
-                    bids = []
-                    asks = []
-                    for i in range(20):
-                        bid_price = mid - spread / 2 - i * spread * 0.5
-                        ask_price = mid + spread / 2 + i * spread * 0.5
+                    self.trades.push(price, quantity, time.time_ns(), is_sell, int(trade_id))
+                    if self.on_trade:
+                        await self.on_trade(self.symbol, self.trades)
+                    
+                    # Generate order book every few trades
+                    if spread:
+                        # Fresh buffers per book: held books (engine, pending broadcast) keep them
+                        bid_px, bid_qty, ask_px, ask_qty = np.empty((4, 20))
+                        simulate_book(price, spread, bid_px, bid_qty, ask_px, ask_qty)
+                        best_bid = float(bid_px[0])
+                        best_ask = float(ask_px[0])
                         
-                        bid_vol = random.uniform(10, 100) / (i + 1)
-                        ask_vol = random.uniform(10, 100) / (i + 1)
+                        order_book = OrderBook(
+                            symbol=self.symbol,
+                            timestamp=time.time_ns(),
+                            bid_px=bid_px,
+                            bid_qty=bid_qty,
+                            ask_px=ask_px,
+                            ask_qty=ask_qty,
+                            best_bid=best_bid,
+                            best_ask=best_ask,
+                            spread=round(best_ask - best_bid, 4),
+                            mid_price=price
+                        )
                         
-                        bids.append(OrderBookLevel(price=round(bid_price, 4), quantity=round(bid_vol, 4)))
-                        asks.append(OrderBookLevel(price=round(ask_price, 4), quantity=round(ask_vol, 4)))
-                    
-                    order_book = OrderBook(
-                        symbol=self.symbol,
-                        timestamp=datetime.utcnow(),
-                        bids=bids,
-                        asks=asks,
-                        best_bid=bids[0].price,
-                        best_ask=asks[0].price,
-                        spread=round(asks[0].price - bids[0].price, 4),
-                        mid_price=round(mid, 4)
-                    )
+                        if self.on_order_book:
+                            self._books.submit(order_book)
                     
-                    if self.on_order_book:
-                        await self.on_order_book(order_book)
-                
-                await asyncio.sleep(random.uniform(0.02, 0.1))
+                    if not fast:
+                        await asyncio.sleep(sleep_s)
+                    elif tick % self.FAST_YIELD_EVERY == 0:
+                        # Stay cooperative without paying for a timer per tick
+                        await asyncio.sleep(0)
                 
             except Exception as e:
-                logger.error(f"Error in simulated feed: {e}")
+                logger.error("Error in simulated feed: %s", e)
                 await asyncio.sleep(1)
     
     async def disconnect(self):
         """Stop simulated feed."""
         self._running = False
+        self._books.cancel()
         self.is_connected = False
         if self.on_connection_change:
             await self.on_connection_change(False, self.symbol)
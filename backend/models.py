@@ -1,10 +1,13 @@
 """MongoDB Models for HFT Signal Generator"""
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
+from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
 import uuid
 
+import numpy as np
+
 
 class DataSource(str, Enum):
     RITHMIC = "rithmic"
@@ -70,21 +73,26 @@ class Settings(BaseModel):
 
 
 # Market Data Models
-class OrderBookLevel(BaseModel):
-    price: float
-    quantity: float
-    orders_count: int = 1
-
-
-class OrderBook(BaseModel):
+@dataclass(slots=True)
+class OrderBook:
+    """Runtime book snapshot passed from the feeds to the engine; never validated or persisted.
+    
+    Feeds may hand over the same instance on every update, refilled in place
+    with ``version`` bumped; copy the arrays to keep an older state.
+    """
     symbol: str
-    timestamp: datetime
-    bids: List[OrderBookLevel]  # Buy orders (descending by price)
-    asks: List[OrderBookLevel]  # Sell orders (ascending by price)
+    timestamp: int  # Epoch nanoseconds
+    # Structure-of-arrays levels: float64 price/quantity columns, bids
+    # descending and asks ascending by price
+    bid_px: np.ndarray
+    bid_qty: np.ndarray
+    ask_px: np.ndarray
+    ask_qty: np.ndarray
     best_bid: float = 0.0
     best_ask: float = 0.0
     spread: float = 0.0
     mid_price: float = 0.0
+    version: int = 0
 
 
 class Trade(BaseModel):
@@ -94,7 +102,7 @@ class Trade(BaseModel):
     quantity: float
     timestamp: datetime
     is_buyer_maker: bool  # True = sell aggressor, False = buy aggressor
-    trade_id: str = ""
+    trade_id: int = 0  # Exchange trade id (Binance aggTrade "a")
 
 
 class Tick(BaseModel):
@@ -1,30 +1,221 @@
 """OpenRouter API Client for AI Model Integration"""
+import asyncio
 import httpx
+import json
 import logging
-from typing import List, Dict, Optional, Any
-from datetime import datetime, timedelta
+import random
+import re
+import time
+from collections import OrderedDict
+from typing import List, Dict, Optional, Any, Tuple
 from models import AIModel, AIAnalysisRequest, AIAnalysisResponse, TradingSignal
 
 logger = logging.getLogger(__name__)
 
+# Try to import orjson for request/response bodies
+try:
+    from orjson import dumps as json_dumps, loads as json_loads
+except ImportError:
+    json_loads = json.loads
+    
+    def json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode()
+
+# Try to import msgspec to decode the model list into typed structs
+try:
+    import msgspec
+    MSGSPEC_AVAILABLE = True
+except ImportError:
+    MSGSPEC_AVAILABLE = False
+
+if MSGSPEC_AVAILABLE:
+    class _Pricing(msgspec.Struct):
+        prompt: float = 0.0
+        completion: float = 0.0
+    
+    class _ModelInfo(msgspec.Struct):
+        id: str = ""
+        name: Optional[str] = None
+        context_length: Optional[int] = 0
+        pricing: _Pricing = msgspec.field(default_factory=_Pricing)
+        description: str = ""
+    
+    class _ModelList(msgspec.Struct):
+        data: List[_ModelInfo] = []
+    
+    # Only the fields above are materialized; strict=False parses the
+    # numeric-string prices ("0.000001") into floats
+    _models_decoder = msgspec.json.Decoder(_ModelList, strict=False)
+
+
+def _keyword_pattern(*keywords: str) -> re.Pattern:
+    """Case-insensitive substring match for any of ``keywords``."""
+    return re.compile("|".join(map(re.escape, keywords)), re.IGNORECASE)
+
+
+# Keyword scanners for validating and mining AI responses
+_BULLISH_RE = _keyword_pattern('bullish', 'buying', 'long', 'upward')
+_BEARISH_RE = _keyword_pattern('bearish', 'selling', 'short', 'downward')
+_HALLUCINATION_RE = _keyword_pattern(
+    'certainly', 'definitely', 'guaranteed', 'will absolutely',
+    '100%', 'impossible', 'never fail'
+)
+_ANOMALY_RE = _keyword_pattern('anomaly', 'unusual', 'abnormal', 'spike', 'irregular', 'divergence')
+_INSIGHT_RE = _keyword_pattern('conclusion', 'recommendation', 'suggest', 'likely')
+
+
+_ANALYST_SYSTEM_PROMPT = """You are an expert high-frequency trading analyst specializing in order flow analysis, market microstructure, and quantitative trading signals. 
+                                
+Your task is to:
+1. Interpret the provided order flow metrics and market data
+2. Identify potential anomalies or significant patterns
+3. Provide actionable trading insights
+4. Explain what large institutional players might be doing
+
+Be concise, specific, and data-driven. Focus on actionable insights.
+Always ground your analysis in the quantitative metrics provided."""
+
+
+_ANALYSIS_REQUEST = """
+## Analysis Request
+1. What is the current order flow telling us about institutional activity?
+2. Are there any anomalies in the data?
+3. What is the likely short-term direction based on microstructure?
+4. Any hidden liquidity or iceberg orders detected?"""
+
+
+class OpenRouterError(Exception):
+    """Non-200 response from the OpenRouter API."""
+    
+    def __init__(self, status_code: int):
+        super().__init__(f"OpenRouter returned HTTP {status_code}")
+        self.status_code = status_code
+
 
 class OpenRouterClient:
     """Client for OpenRouter API to access various AI models."""
     
     BASE_URL = "https://openrouter.ai/api/v1"
     
+    CACHE_TTL = 3600.0  # Model list lifetime in seconds
+    CACHE_REFRESH_MARGIN = 300.0  # Refresh in the background this long before expiry
+    MAX_CONNECTIONS = 100
+    
+    # Completions answered with one of these statuses are retried with backoff
+    RETRY_STATUSES = frozenset({429, 502, 503})
+    MAX_ATTEMPTS = 3
+    MAX_RETRY_DELAY = 10.0  # Seconds; caps Retry-After
+    
+    SUMMARY_CACHE_TTL = 30.0  # Seconds a quick summary is reused for the same prompt
+    SUMMARY_CACHE_SIZE = 128
+    
     def __init__(self):
         self.api_key: str = ""
         self.selected_model: str = ""
         self.models_cache: List[AIModel] = []
-        self.cache_timestamp: Optional[datetime] = None
-        self.cache_duration = timedelta(hours=1)
+        self._cache_deadline = 0.0  # time.monotonic() expiry of models_cache
+        self._models_task: Optional[asyncio.Task] = None  # In-flight /models download
+        # Plain-dict dump of the model list it was built from, for the API response
+        self._dumped_models: Optional[List[AIModel]] = None
+        self._model_dicts: List[Dict[str, Any]] = []
+        # Caps in-flight completions so fan-out queues here instead of timing out in the pool
+        self._chat_slots = asyncio.Semaphore(self.MAX_CONNECTIONS)
+        # (model, prompt) -> (summary, monotonic expiry), oldest first
+        self._summary_cache: "OrderedDict[Tuple[str, str], Tuple[str, float]]" = OrderedDict()
         self.is_connected = False
+        self._headers: Dict[str, str] = {}
+        self._chat_headers: Dict[str, str] = {}  # _headers plus app attribution
+        # Pooled client kept across requests so repeat calls reuse the TLS connection
+        self._client: Optional[httpx.AsyncClient] = None
     
     def set_api_key(self, api_key: str):
         """Set the OpenRouter API key."""
         self.api_key = api_key
         self.is_connected = bool(api_key)
+        self._headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        }
+        self._chat_headers = {
+            **self._headers,
+            "HTTP-Referer": "https://hft-signal-generator.app",
+            "X-Title": "HFT Signal Generator"
+        }
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the pooled client, creating it on first use."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.BASE_URL,
+                limits=httpx.Limits(max_connections=self.MAX_CONNECTIONS, max_keepalive_connections=20),
+                timeout=httpx.Timeout(60.0)
+            )
+        return self._client
+    
+    async def close(self):
+        """Close the pooled client (called on app shutdown)."""
+        if self._models_task is not None:
+            self._models_task.cancel()
+            self._models_task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await self.close()
+    
+    async def _post_chat(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        temperature: float,
+        timeout: float,
+        headers: Optional[Dict[str, str]] = None
+    ) -> str:
+        """Run a chat completion with the selected model and return the reply text.
+        
+        Rate-limited (429) and transient gateway (502/503) responses are
+        retried up to MAX_ATTEMPTS times, waiting for Retry-After when given
+        and for a jittered exponential backoff otherwise. Raises
+        OpenRouterError on any other non-200 response or when retries run out.
+        """
+        body = json_dumps({
+            "model": self.selected_model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature
+        })
+        for attempt in range(self.MAX_ATTEMPTS):
+            async with self._chat_slots:
+                response = await self._get_client().post(
+                    "/chat/completions",
+                    headers=headers or self._headers,
+                    content=body,
+                    timeout=timeout
+                )
+            if response.status_code == 200:
+                return json_loads(response.content)['choices'][0]['message']['content']
+            if response.status_code not in self.RETRY_STATUSES or attempt == self.MAX_ATTEMPTS - 1:
+                break
+            
+            delay = self._retry_delay(response, attempt)
+            logger.warning(f"OpenRouter returned {response.status_code}, retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+        
+        raise OpenRouterError(response.status_code)
+    
+    def _retry_delay(self, response: httpx.Response, attempt: int) -> float:
+        """Seconds to wait before retrying ``response``."""
+        retry_after = response.headers.get("Retry-After")
+        try:
+            # Only the delta-seconds form is honoured; HTTP dates fall back to backoff
+            delay = float(retry_after)
+        except (TypeError, ValueError):
+            delay = (2 ** attempt) * (0.5 + random.random())
+        return min(max(delay, 0.0), self.MAX_RETRY_DELAY)
     
     def set_model(self, model_id: str):
         """Set the selected AI model."""
@@ -32,28 +223,62 @@ class OpenRouterClient:
     
     async def fetch_models(self, force_refresh: bool = False) -> List[AIModel]:
         """Fetch available models from OpenRouter."""
-        # Return cached if valid
-        if not force_refresh and self.models_cache and self.cache_timestamp:
-            if datetime.utcnow() - self.cache_timestamp < self.cache_duration:
+        # Return cached if valid, refreshing it in the background once it nears expiry
+        if not force_refresh and self.models_cache:
+            now = time.monotonic()
+            if now < self._cache_deadline:
+                if now >= self._cache_deadline - self.CACHE_REFRESH_MARGIN:
+                    self._start_models_download()
                 return self.models_cache
         
         if not self.api_key:
             logger.warning("No API key set for OpenRouter")
             return []
         
+        # Concurrent callers (and a background refresh) share one request;
+        # shield keeps a cancelled caller from cancelling it for the others
+        return await asyncio.shield(self._start_models_download())
+    
+    async def fetch_model_dicts(self, force_refresh: bool = False) -> List[Dict[str, Any]]:
+        """fetch_models as plain dicts, dumped once per downloaded model list."""
+        models = await self.fetch_models(force_refresh)
+        # A refresh replaces models_cache with a new list, so identity tells them apart
+        if models is not self._dumped_models:
+            self._model_dicts = [m.dict() for m in models]
+            self._dumped_models = models
+        return self._model_dicts
+    
+    def _start_models_download(self) -> asyncio.Task:
+        """Return the in-flight model list download, starting one if none is running."""
+        if self._models_task is None or self._models_task.done():
+            self._models_task = asyncio.create_task(self._load_models())
+        return self._models_task
+    
+    async def _load_models(self) -> List[AIModel]:
+        """Download the model list and update the cache."""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.BASE_URL}/models",
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    timeout=30.0
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
+            response = await self._get_client().get(
+                "/models",
+                headers=self._headers,
+                timeout=30.0
+            )
+            
+            if response.status_code == 200:
+                if MSGSPEC_AVAILABLE:
+                    # Typed decode skips building dicts for the per-model fields we don't read
+                    models = [
+                        AIModel(
+                            id=m.id,
+                            name=m.id if m.name is None else m.name,
+                            context_length=m.context_length or 0,
+                            pricing_prompt=m.pricing.prompt,
+                            pricing_completion=m.pricing.completion,
+                            description=m.description
+                        )
+                        for m in _models_decoder.decode(response.content).data
+                    ]
+                else:
+                    data = json_loads(response.content)
                     models = []
                     
                     for model_data in data.get('data', []):
@@ -66,18 +291,26 @@ class OpenRouterClient:
                             description=model_data.get('description', '')
                         )
                         models.append(model)
-                    
+                
+                self.is_connected = True
+                
+                # Keep the previous list if the new one looks like a transient truncation
+                if models and len(models) * 2 >= len(self.models_cache):
                     self.models_cache = models
-                    self.cache_timestamp = datetime.utcnow()
-                    self.is_connected = True
-                    
+                    self._cache_deadline = time.monotonic() + self.CACHE_TTL
                     logger.info(f"Fetched {len(models)} models from OpenRouter")
-                    return models
                 else:
-                    logger.error(f"OpenRouter API error: {response.status_code} - {response.text}")
-                    self.is_connected = False
-                    return []
-                    
+                    logger.warning(
+                        f"Ignoring OpenRouter model list of {len(models)}, "
+                        f"keeping {len(self.models_cache)} cached"
+                    )
+                return self.models_cache
+            else:
+                # CDN error pages can be large HTML; log only the head of the body
+                logger.error("OpenRouter API error: %s - %s", response.status_code, response.text[:512])
+                self.is_connected = False
+                return []
+                
         except Exception as e:
             logger.error(f"Error fetching OpenRouter models: {e}")
             self.is_connected = False
@@ -103,69 +336,40 @@ class OpenRouterClient:
         prompt = self._build_analysis_prompt(context, metrics, signal)
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.BASE_URL}/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Content-Type": "application/json",
-                        "HTTP-Referer": "https://hft-signal-generator.app",
-                        "X-Title": "HFT Signal Generator"
-                    },
-                    json={
-                        "model": self.selected_model,
-                        "messages": [
-                            {
-                                "role": "system",
-                                "content": """You are an expert high-frequency trading analyst specializing in order flow analysis, market microstructure, and quantitative trading signals. 
-                                
-Your task is to:
-1. Interpret the provided order flow metrics and market data
-2. Identify potential anomalies or significant patterns
-3. Provide actionable trading insights
-4. Explain what large institutional players might be doing
-
-Be concise, specific, and data-driven. Focus on actionable insights.
-Always ground your analysis in the quantitative metrics provided."""
-                            },
-                            {
-                                "role": "user",
-                                "content": prompt
-                            }
-                        ],
-                        "max_tokens": 500,
-                        "temperature": 0.3  # Lower temperature for more consistent analysis
-                    },
-                    timeout=60.0
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    ai_response = data['choices'][0]['message']['content']
-                    
-                    # Validate AI response against quantitative data
-                    validated, confidence_adjustment = self._validate_ai_response(
-                        ai_response, metrics, signal
-                    )
-                    
-                    # Extract anomalies and insights
-                    anomalies = self._extract_anomalies(ai_response)
-                    insight = self._extract_trading_insight(ai_response)
-                    
-                    return AIAnalysisResponse(
-                        analysis=ai_response,
-                        anomalies_detected=anomalies,
-                        trading_insight=insight,
-                        confidence_adjustment=confidence_adjustment,
-                        validated=validated
-                    )
-                else:
-                    logger.error(f"OpenRouter completion error: {response.status_code}")
-                    return AIAnalysisResponse(
-                        analysis=f"AI analysis failed: {response.status_code}",
-                        validated=False
-                    )
-                    
+            ai_response = await self._post_chat(
+                [
+                    {"role": "system", "content": _ANALYST_SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=500,
+                temperature=0.3,  # Lower temperature for more consistent analysis
+                timeout=60.0,
+                headers=self._chat_headers
+            )
+            
+            # Validate AI response against quantitative data
+            validated, confidence_adjustment = self._validate_ai_response(
+                ai_response, metrics, signal
+            )
+            
+            # Extract anomalies and insights
+            anomalies = self._extract_anomalies(ai_response)
+            insight = self._extract_trading_insight(ai_response)
+            
+            return AIAnalysisResponse(
+                analysis=ai_response,
+                anomalies_detected=anomalies,
+                trading_insight=insight,
+                confidence_adjustment=confidence_adjustment,
+                validated=validated
+            )
+        
+        except OpenRouterError as e:
+            logger.error(f"OpenRouter completion error: {e.status_code}")
+            return AIAnalysisResponse(
+                analysis=f"AI analysis failed: {e.status_code}",
+                validated=False
+            )
         except Exception as e:
             logger.error(f"Error in AI analysis: {e}")
             return AIAnalysisResponse(
@@ -174,7 +378,10 @@ Always ground your analysis in the quantitative metrics provided."""
             )
     
     def _build_analysis_prompt(self, context: str, metrics: Dict[str, Any], signal: Optional[TradingSignal]) -> str:
-        """Build the analysis prompt for the AI model."""
+        """Build the analysis prompt for the AI model.
+        
+        Each section is formatted as one f-string and appended once.
+        """
         prompt_parts = [
             f"## Market Context\n{context}\n",
             "## Order Flow Metrics\n"
@@ -183,46 +390,54 @@ Always ground your analysis in the quantitative metrics provided."""
         # Add metrics
         if 'delta' in metrics:
             delta = metrics['delta']
-            prompt_parts.append(f"- Raw Delta: {delta.get('raw_delta', 0):.2f}")
-            prompt_parts.append(f"- Normalized Delta: {delta.get('normalized_delta', 0):.4f}")
-            prompt_parts.append(f"- Cumulative Delta: {delta.get('cumulative_delta', 0):.2f}")
+            prompt_parts.append(
+                f"- Raw Delta: {delta.get('raw_delta', 0):.2f}\n"
+                f"- Normalized Delta: {delta.get('normalized_delta', 0):.4f}\n"
+                f"- Cumulative Delta: {delta.get('cumulative_delta', 0):.2f}"
+            )
         
         if 'absorption' in metrics:
             absorption = metrics['absorption']
-            prompt_parts.append(f"- Absorption Score: {absorption.get('score', 0):.4f}")
-            prompt_parts.append(f"- Bid Absorption: {absorption.get('bid_absorption', 0):.4f}")
-            prompt_parts.append(f"- Ask Absorption: {absorption.get('ask_absorption', 0):.4f}")
+            prompt_parts.append(
+                f"- Absorption Score: {absorption.get('score', 0):.4f}\n"
+                f"- Bid Absorption: {absorption.get('bid_absorption', 0):.4f}\n"
+                f"- Ask Absorption: {absorption.get('ask_absorption', 0):.4f}"
+            )
         
         if 'iceberg' in metrics:
             iceberg = metrics['iceberg']
-            prompt_parts.append(f"- Iceberg Probability: {iceberg.get('probability', 0):.4f}")
-            prompt_parts.append(f"- Fill-to-Display Ratio: {iceberg.get('fill_to_display_ratio', 0):.4f}")
+            prompt_parts.append(
+                f"- Iceberg Probability: {iceberg.get('probability', 0):.4f}\n"
+                f"- Fill-to-Display Ratio: {iceberg.get('fill_to_display_ratio', 0):.4f}"
+            )
         
         if 'momentum' in metrics:
             momentum = metrics['momentum']
-            prompt_parts.append(f"- OFMBI: {momentum.get('ofmbi', 0):.4f}")
-            prompt_parts.append(f"- Tape Speed: {momentum.get('tape_speed', 0):.2f} trades/sec")
+            prompt_parts.append(
+                f"- OFMBI: {momentum.get('ofmbi', 0):.4f}\n"
+                f"- Tape Speed: {momentum.get('tape_speed', 0):.2f} trades/sec"
+            )
         
         if 'structure' in metrics:
             structure = metrics['structure']
-            prompt_parts.append(f"- Market Regime: {structure.get('regime', 'unknown')}")
-            prompt_parts.append(f"- Trend Direction: {structure.get('trend_direction', 'neutral')}")
-            prompt_parts.append(f"- BOS Detected: {structure.get('bos_detected', False)}")
-            prompt_parts.append(f"- CHOCH Detected: {structure.get('choch_detected', False)}")
+            prompt_parts.append(
+                f"- Market Regime: {structure.get('regime', 'unknown')}\n"
+                f"- Trend Direction: {structure.get('trend_direction', 'neutral')}\n"
+                f"- BOS Detected: {structure.get('bos_detected', False)}\n"
+                f"- CHOCH Detected: {structure.get('choch_detected', False)}"
+            )
         
         if signal:
-            prompt_parts.append(f"\n## Current Signal")
-            prompt_parts.append(f"- Signal Type: {signal.signal_type.value}")
-            prompt_parts.append(f"- HFSS Score: {signal.hfss_score:.4f}")
-            prompt_parts.append(f"- Confidence: {signal.confidence:.2%}")
-            prompt_parts.append(f"- P(Buy): {signal.probability_buy:.2%}")
-            prompt_parts.append(f"- P(Sell): {signal.probability_sell:.2%}")
-        
-        prompt_parts.append("\n## Analysis Request")
-        prompt_parts.append("1. What is the current order flow telling us about institutional activity?")
-        prompt_parts.append("2. Are there any anomalies in the data?")
-        prompt_parts.append("3. What is the likely short-term direction based on microstructure?")
-        prompt_parts.append("4. Any hidden liquidity or iceberg orders detected?")
+            prompt_parts.append(
+                f"\n## Current Signal\n"
+                f"- Signal Type: {signal.signal_type.value}\n"
+                f"- HFSS Score: {signal.hfss_score:.4f}\n"
+                f"- Confidence: {signal.confidence:.2%}\n"
+                f"- P(Buy): {signal.probability_buy:.2%}\n"
+                f"- P(Sell): {signal.probability_sell:.2%}"
+            )
+        
+        prompt_parts.append(_ANALYSIS_REQUEST)
         
         return "\n".join(prompt_parts)
     
@@ -239,8 +454,8 @@ Always ground your analysis in the quantitative metrics provided."""
         confidence_adjustment = 0.0
         
         # Check for directional consistency
-        ai_bullish = any(word in ai_response.lower() for word in ['bullish', 'buying', 'long', 'upward'])
-        ai_bearish = any(word in ai_response.lower() for word in ['bearish', 'selling', 'short', 'downward'])
+        ai_bullish = _BULLISH_RE.search(ai_response) is not None
+        ai_bearish = _BEARISH_RE.search(ai_response) is not None
         
         if signal:
             quant_bullish = signal.probability_buy > signal.probability_sell
@@ -256,13 +471,7 @@ Always ground your analysis in the quantitative metrics provided."""
                 confidence_adjustment = 0.05
         
         # Check for hallucination indicators
-        hallucination_indicators = [
-            'certainly', 'definitely', 'guaranteed', 'will absolutely',
-            '100%', 'impossible', 'never fail'
-        ]
-        
-        has_hallucination = any(indicator in ai_response.lower() for indicator in hallucination_indicators)
-        if has_hallucination:
+        if _HALLUCINATION_RE.search(ai_response):
             confidence_adjustment -= 0.1
         
         # Validated if no major issues
@@ -274,14 +483,13 @@ Always ground your analysis in the quantitative metrics provided."""
         """Extract detected anomalies from AI response."""
         anomalies = []
         
-        anomaly_keywords = ['anomaly', 'unusual', 'abnormal', 'spike', 'irregular', 'divergence']
-        
-        lines = ai_response.split('\n')
-        for line in lines:
-            if any(keyword in line.lower() for keyword in anomaly_keywords):
+        for line in ai_response.split('\n'):
+            if _ANOMALY_RE.search(line):
                 anomalies.append(line.strip())
+                if len(anomalies) == 5:  # Limit to 5 anomalies
+                    break
         
-        return anomalies[:5]  # Limit to 5 anomalies
+        return anomalies
     
     def _extract_trading_insight(self, ai_response: str) -> str:
         """Extract main trading insight from AI response."""
@@ -289,7 +497,7 @@ Always ground your analysis in the quantitative metrics provided."""
         lines = ai_response.split('\n')
         
         for i, line in enumerate(lines):
-            if any(word in line.lower() for word in ['conclusion', 'recommendation', 'suggest', 'likely']):
+            if _INSIGHT_RE.search(line):
                 # Return this line and the next if available
                 insight = line.strip()
                 if i + 1 < len(lines):
@@ -298,46 +506,66 @@ Always ground your analysis in the quantitative metrics provided."""
         
         # If no specific conclusion, return last non-empty line
         for line in reversed(lines):
-            if line.strip():
-                return line.strip()[:300]
+            stripped = line.strip()
+            if stripped:
+                return stripped[:300]
         
         return "No specific insight extracted"
     
+    async def analyze_bundle(
+        self,
+        context: str,
+        metrics: Dict[str, Any],
+        signal: Optional[TradingSignal] = None
+    ) -> Tuple[AIAnalysisResponse, str]:
+        """Run analyze_order_flow and get_quick_summary concurrently.
+        
+        Both requests share the pooled client, so the bundle takes about as
+        long as the slower of the two instead of their sum.
+        """
+        analysis, summary = await asyncio.gather(
+            self.analyze_order_flow(context, metrics, signal),
+            self.get_quick_summary(metrics)
+        )
+        return analysis, summary
+    
     async def get_quick_summary(self, metrics: Dict[str, Any]) -> str:
-        """Get a quick one-liner summary of current market state."""
+        """Get a quick one-liner summary of current market state.
+        
+        The prompt only carries 3-decimal metrics, so repeated calls on a
+        quiet market often produce the same prompt; its summary is reused
+        for SUMMARY_CACHE_TTL seconds instead of asking the model again.
+        """
         if not self.api_key or not self.selected_model:
             return "AI summary unavailable"
         
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.BASE_URL}/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": self.selected_model,
-                        "messages": [
-                            {
-                                "role": "user",
-                                "content": f"""In one sentence (max 100 chars), summarize this market state:
+        prompt = f"""In one sentence (max 100 chars), summarize this market state:
 Delta: {metrics.get('delta', {}).get('normalized_delta', 0):.3f}
 Absorption: {metrics.get('absorption', {}).get('score', 0):.3f}
 Regime: {metrics.get('structure', {}).get('regime', 'unknown')}
 Trend: {metrics.get('structure', {}).get('trend_direction', 'neutral')}"""
-                            }
-                        ],
-                        "max_tokens": 50,
-                        "temperature": 0.5
-                    },
-                    timeout=15.0
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    return data['choices'][0]['message']['content'].strip()
-                    
+        
+        key = (self.selected_model, prompt)
+        now = time.monotonic()
+        cached = self._summary_cache.get(key)
+        if cached is not None and now < cached[1]:
+            return cached[0]
+        
+        try:
+            summary = await self._post_chat(
+                [{"role": "user", "content": prompt}],
+                max_tokens=50,
+                temperature=0.5,
+                timeout=15.0
+            )
+            summary = summary.strip()
+            
+            self._summary_cache[key] = (summary, now + self.SUMMARY_CACHE_TTL)
+            self._summary_cache.move_to_end(key)
+            if len(self._summary_cache) > self.SUMMARY_CACHE_SIZE:
+                self._summary_cache.popitem(last=False)
+            return summary
+            
         except Exception as e:
             logger.error(f"Error getting quick summary: {e}")
         
@@ -0,0 +1,214 @@
+"""Preallocated rolling windows for the analytics hot path
+
+Rolling series are kept in contiguous NumPy arrays instead of deques of
+Python objects so windowed queries can use vectorized/JIT kernels directly.
+"""
+import heapq
+from collections import deque
+from typing import Tuple
+
+import numpy as np
+
+
+class RollingBuffer:
+    """Fixed-capacity append-only window backed by a contiguous NumPy array.
+
+    Storage is twice the capacity so the live window is always a single
+    chronological slice: once the end of storage is reached the newest
+    ``capacity`` rows are shifted to the front (amortized O(1) per append).
+    """
+
+    def __init__(self, capacity: int, dtype=np.float64):
+        self.capacity = capacity
+        self._buf = np.empty(capacity * 2, dtype=dtype)
+        self._end = 0
+
+    def append(self, value):
+        """Append a single value, evicting the oldest one when full."""
+        if self._end == self._buf.shape[0]:
+            self._compact()
+        self._buf[self._end] = value
+        self._end += 1
+
+    def extend(self, values: np.ndarray):
+        """Append a batch of values in one slice write."""
+        n = len(values)
+        if n >= self.capacity:
+            self._buf[:self.capacity] = values[n - self.capacity:]
+            self._end = self.capacity
+            return
+        if self._end + n > self._buf.shape[0]:
+            self._compact()
+        self._buf[self._end:self._end + n] = values
+        self._end += n
+
+    def _compact(self):
+        """Move the newest ``capacity`` rows to the front of storage."""
+        self._buf[:self.capacity] = self._buf[self._end - self.capacity:self._end]
+        self._end = self.capacity
+
+    def view(self) -> np.ndarray:
+        """Zero-copy view of the live window, oldest first."""
+        return self._buf[max(0, self._end - self.capacity):self._end]
+
+    def last(self):
+        """Most recently appended value."""
+        return self._buf[self._end - 1]
+
+    def __len__(self) -> int:
+        return min(self._end, self.capacity)
+
+
+class SlidingMedian:
+    """Exact running median over the last ``capacity`` values.
+
+    Two heaps hold the lower (max-heap, negated) and upper (min-heap) halves
+    of the window. Evicted values are deleted lazily: they are counted in
+    ``_delayed`` and only popped once they reach the top of a heap, so each
+    update is O(log n) instead of a full sort.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._window = deque()
+        self._lower = []
+        self._upper = []
+        self._lower_size = 0
+        self._upper_size = 0
+        self._delayed = {}
+
+    def append(self, value: float):
+        """Add a value, evicting the oldest one when the window is full."""
+        if len(self._window) == self.capacity:
+            self._remove(self._window.popleft())
+        self._window.append(value)
+        
+        # Route through the lower half so the halves stay ordered even when
+        # eviction just emptied one of them
+        heapq.heappush(self._upper, -heapq.heappushpop(self._lower, -value))
+        self._upper_size += 1
+        self._prune(self._lower, -1)
+        self._rebalance()
+        
+        # Lazily deleted values buried below the tops are only dropped by a rebuild
+        if len(self._lower) + len(self._upper) > 2 * self.capacity:
+            self._rebuild()
+
+    def median(self) -> float:
+        """Median of the current window (mean of the middle pair when even)."""
+        if self._lower_size > self._upper_size:
+            return -self._lower[0]
+        return (-self._lower[0] + self._upper[0]) / 2
+
+    def last(self) -> float:
+        """Most recently appended value."""
+        return self._window[-1]
+
+    def _remove(self, value: float):
+        self._delayed[value] = self._delayed.get(value, 0) + 1
+        if value <= -self._lower[0]:
+            self._lower_size -= 1
+            if value == -self._lower[0]:
+                self._prune(self._lower, -1)
+        else:
+            self._upper_size -= 1
+            if value == self._upper[0]:
+                self._prune(self._upper, 1)
+
+    def _prune(self, heap: list, sign: int):
+        """Pop lazily deleted values off the top of a heap."""
+        while heap:
+            value = sign * heap[0]
+            pending = self._delayed.get(value, 0)
+            if not pending:
+                break
+            if pending == 1:
+                del self._delayed[value]
+            else:
+                self._delayed[value] = pending - 1
+            heapq.heappop(heap)
+
+    def _rebalance(self):
+        """Keep the lower half equal to or one larger than the upper half."""
+        if self._lower_size > self._upper_size + 1:
+            heapq.heappush(self._upper, -heapq.heappop(self._lower))
+            self._lower_size -= 1
+            self._upper_size += 1
+            self._prune(self._lower, -1)
+        elif self._lower_size < self._upper_size:
+            heapq.heappush(self._lower, -heapq.heappop(self._upper))
+            self._upper_size -= 1
+            self._lower_size += 1
+            self._prune(self._upper, 1)
+
+    def _rebuild(self):
+        """Rebuild both heaps from the live window (amortized over ``capacity`` appends)."""
+        values = sorted(self._window)
+        half = (len(values) + 1) // 2
+        # Sorted lists already satisfy the heap invariant
+        self._lower = [-v for v in reversed(values[:half])]
+        self._upper = values[half:]
+        self._lower_size = half
+        self._upper_size = len(values) - half
+        self._delayed = {}
+
+    def __len__(self) -> int:
+        return len(self._window)
+
+
+class TradeRingBuffer:
+    """Preallocated structure-of-arrays buffer that feeds push raw trades into.
+    
+    Each trade is a row across the ``price``/``qty``/``ts_ns``/``side``/``trade_id``
+    columns (``side`` is 1 for sell aggressors, i.e. buyer-maker prints). Like
+    RollingBuffer, storage is twice the capacity so the rows pushed since the
+    last ``drain`` are always one contiguous slice; only the newest
+    ``capacity`` rows are kept if the consumer falls behind.
+    """
+    
+    def __init__(self, capacity: int = 4096):
+        self.capacity = capacity
+        self.price = np.empty(capacity * 2, np.float64)
+        self.qty = np.empty(capacity * 2, np.float64)
+        self.ts_ns = np.empty(capacity * 2, np.int64)
+        self.side = np.empty(capacity * 2, np.uint8)
+        self.trade_id = np.empty(capacity * 2, np.int64)
+        self._end = 0
+        self._read = 0
+    
+    def push(self, price: float, qty: float, ts_ns: int, side: int, trade_id: int = 0):
+        """Write one trade into the next row."""
+        if self._end == self.price.shape[0]:
+            self._compact()
+        i = self._end
+        self.price[i] = price
+        self.qty[i] = qty
+        self.ts_ns[i] = ts_ns
+        self.side[i] = side
+        self.trade_id[i] = trade_id
+        self._end = i + 1
+    
+    def _compact(self):
+        """Move the newest ``capacity`` rows to the front of storage."""
+        shift = self._end - self.capacity
+        for col in (self.price, self.qty, self.ts_ns, self.side, self.trade_id):
+            col[:self.capacity] = col[shift:self._end]
+        self._end = self.capacity
+        self._read = max(0, self._read - shift)
+    
+    def drain(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Zero-copy views of the rows pushed since the previous drain, oldest first.
+        
+        Returns (price, qty, ts_ns, side, trade_id). The views are only valid
+        until the next push, so consume them before yielding to the feed.
+        """
+        start, end = self._read, self._end
+        self._read = end
+        return (
+            self.price[start:end], self.qty[start:end], self.ts_ns[start:end],
+            self.side[start:end], self.trade_id[start:end]
+        )
+    
+    def __len__(self) -> int:
+        """Number of rows waiting to be drained."""
+        return self._end - self._read
@@ -3,8 +3,9 @@
 Full-featured backend for high-frequency trading signal generation.
 Supports Rithmic (XAUUSD), Binance (Crypto), and OpenRouter AI integration.
 """
-from fastapi import FastAPI, APIRouter, WebSocket, WebSocketDisconnect, HTTPException, Query
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, APIRouter, WebSocket, WebSocketDisconnect, HTTPException, Query, Header
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
@@ -12,6 +13,8 @@ import os
 import logging
 import asyncio
 import json
+import time
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 from datetime import datetime
@@ -24,12 +27,27 @@ load_dotenv(ROOT_DIR / '.env')
 # Import local modules
 from models import (
     Settings, RithmicCredentials, BinanceSettings, OpenRouterSettings,
-    SignalWeights, DataSource, Trade, OrderBook, TradingSignal, SignalType
+    SignalWeights, DataSource, OrderBook, TradingSignal, SignalType
 )
 from analytics_engine import AnalyticsEngine
-from data_feeds import BinanceFeed, RithmicFeed, SimulatedFeed
+from rolling import TradeRingBuffer
+from _jit import warmup as warmup_kernels
+from data_feeds import BinanceFeed, RithmicFeed, SimulatedFeed, close_http_client
 from openrouter_client import OpenRouterClient
 
+# Try to import orjson for encoding WS payloads and decoding client messages
+try:
+    from orjson import dumps as _orjson_dumps, loads as json_loads
+    
+    def json_dumps(obj) -> str:
+        return _orjson_dumps(obj).decode()
+except ImportError:
+    json_loads = json.loads
+    
+    def json_dumps(obj) -> str:
+        # Same compact form as Starlette's send_json; datetimes as orjson writes them
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=datetime.isoformat)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -57,46 +75,102 @@ openrouter_client = OpenRouterClient()
 
 # WebSocket connection manager
 class ConnectionManager:
+    """Fans server events out to the connected WebSocket clients.
+    
+    Every client has a bounded outbound queue drained by its own relay task,
+    so broadcasting never waits on a socket and a slow client only delays
+    itself. When a client's queue is full its oldest pending message is
+    dropped in favour of the new one.
+    """
+    
+    QUEUE_SIZE = 256
+    
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        self.queues: Dict[WebSocket, asyncio.Queue] = {}
+        self.relays: Dict[WebSocket, asyncio.Task] = {}
     
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        queue = asyncio.Queue(self.QUEUE_SIZE)
+        self.queues[websocket] = queue
+        self.relays[websocket] = asyncio.create_task(self._relay(websocket, queue))
     
     def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+        self.queues.pop(websocket, None)
+        relay = self.relays.pop(websocket, None)
+        if relay is not None and relay is not asyncio.current_task():
+            relay.cancel()
     
-    async def broadcast(self, message: dict):
-        for connection in self.active_connections[:]:
-            try:
-                await connection.send_json(message)
-            except Exception:
-                self.disconnect(connection)
+    async def _relay(self, websocket: WebSocket, queue: asyncio.Queue):
+        """Send one client's queued messages in order until its socket fails."""
+        try:
+            while True:
+                await websocket.send_text(await queue.get())
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.disconnect(websocket)
+    
+    def send(self, websocket: WebSocket, message: dict):
+        """Queue ``message`` for a single client behind its pending broadcasts."""
+        queue = self.queues.get(websocket)
+        if queue is not None:
+            self._put(queue, json_dumps(message))
+    
+    def broadcast(self, message: dict):
+        """Queue ``message`` for every client without waiting on any socket."""
+        if not self.queues:
+            return
+        # Encode once for all clients instead of once per connection in send_json
+        text = json_dumps(message)
+        for queue in self.queues.values():
+            self._put(queue, text)
+    
+    @staticmethod
+    def _put(queue: asyncio.Queue, text: str):
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(text)
 
 manager = ConnectionManager()
 
 # Current state
 current_settings: Optional[Settings] = None
 current_signal: Optional[TradingSignal] = None
+current_signal_dict: Optional[dict] = None  # current_signal.dict(), built once per signal
 is_streaming = False
 stream_task: Optional[asyncio.Task] = None
+flush_task: Optional[asyncio.Task] = None
+signal_writer_task: Optional[asyncio.Task] = None
+
+# Generated signals waiting for signal_writer to store them in bulk
+SIGNAL_BATCH_SIZE = 500
+signal_queue: asyncio.Queue = asyncio.Queue(10_000)
+
+# Outbound market data waiting for the next flush_broadcasts tick
+BROADCAST_INTERVAL = 0.025
+pending_trades: List[dict] = []
+pending_books: Dict[str, Any] = {}  # Latest OrderBook, or a ready BBO message
 
 # ==================== SETTINGS ENDPOINTS ====================
 
 @api_router.get("/settings")
 async def get_settings():
-    """Get current settings."""
-    global current_settings
+    """Get current settings.
     
-    settings_doc = await db.settings.find_one({"_id": "main"})
+    Every settings write goes through the in-memory copy, so Mongo is only
+    read here before anything has been loaded.
+    """
+    global current_settings
     
-    if settings_doc:
-        settings_doc.pop('_id', None)
-        current_settings = Settings(**settings_doc)
-    else:
-        current_settings = Settings()
+    if current_settings is None:
+        settings_doc = await db.settings.find_one({"_id": "main"})
+        
+        if settings_doc:
+            settings_doc.pop('_id', None)
+            current_settings = Settings(**settings_doc)
+        else:
+            current_settings = Settings()
     
     return current_settings.dict()
 
@@ -118,82 +192,58 @@ async def save_settings(settings: Settings):
     
     return {"status": "success", "message": "Settings saved"}
 
-@api_router.post("/settings/rithmic")
-async def update_rithmic_settings(credentials: RithmicCredentials):
-    """Update Rithmic credentials."""
+async def patch_settings(section: str, update: BaseModel, touch: bool = True) -> BaseModel:
+    """Merge the fields a client sent into one settings section.
+    
+    Only those fields are written, as dotted ``$set`` paths, instead of the
+    whole section. Returns the merged section.
+    """
     global current_settings
     
     if not current_settings:
         current_settings = Settings()
     
-    current_settings.rithmic = credentials
-    current_settings.updated_at = datetime.utcnow()
+    changes = update.dict(exclude_unset=True)
+    merged = getattr(current_settings, section).model_copy(update=changes)
+    setattr(current_settings, section, merged)
     
-    await db.settings.update_one(
-        {"_id": "main"},
-        {"$set": {"rithmic": credentials.dict(), "updated_at": current_settings.updated_at}},
-        upsert=True
-    )
+    fields = {f"{section}.{key}": value for key, value in changes.items()}
+    if touch:
+        current_settings.updated_at = datetime.utcnow()
+        fields["updated_at"] = current_settings.updated_at
+    if fields:
+        await db.settings.update_one({"_id": "main"}, {"$set": fields}, upsert=True)
+    
+    return merged
+
+@api_router.post("/settings/rithmic")
+async def update_rithmic_settings(credentials: RithmicCredentials):
+    """Update Rithmic credentials."""
+    await patch_settings("rithmic", credentials)
     
     return {"status": "success", "message": "Rithmic credentials updated"}
 
 @api_router.post("/settings/binance")
 async def update_binance_settings(settings: BinanceSettings):
     """Update Binance settings."""
-    global current_settings
-    
-    if not current_settings:
-        current_settings = Settings()
-    
-    current_settings.binance = settings
-    current_settings.updated_at = datetime.utcnow()
-    
-    await db.settings.update_one(
-        {"_id": "main"},
-        {"$set": {"binance": settings.dict(), "updated_at": current_settings.updated_at}},
-        upsert=True
-    )
+    await patch_settings("binance", settings)
     
     return {"status": "success", "message": "Binance settings updated"}
 
 @api_router.post("/settings/openrouter")
 async def update_openrouter_settings(settings: OpenRouterSettings):
     """Update OpenRouter API settings."""
-    global current_settings
-    
-    if not current_settings:
-        current_settings = Settings()
-    
-    current_settings.openrouter = settings
-    current_settings.updated_at = datetime.utcnow()
-    
-    openrouter_client.set_api_key(settings.api_key)
-    openrouter_client.set_model(settings.selected_model)
+    merged = await patch_settings("openrouter", settings)
     
-    await db.settings.update_one(
-        {"_id": "main"},
-        {"$set": {"openrouter": settings.dict(), "updated_at": current_settings.updated_at}},
-        upsert=True
-    )
+    openrouter_client.set_api_key(merged.api_key)
+    openrouter_client.set_model(merged.selected_model)
     
     return {"status": "success", "message": "OpenRouter settings updated"}
 
 @api_router.post("/settings/weights")
 async def update_signal_weights(weights: SignalWeights):
     """Update signal generation weights."""
-    global current_settings
-    
-    if not current_settings:
-        current_settings = Settings()
-    
-    current_settings.signal_weights = weights
-    analytics_engine.update_weights(weights)
-    
-    await db.settings.update_one(
-        {"_id": "main"},
-        {"$set": {"signal_weights": weights.dict()}},
-        upsert=True
-    )
+    analytics_engine.update_weights(await patch_settings("signal_weights", weights, touch=False))
     
     return {"status": "success", "message": "Signal weights updated"}
 
@@ -225,6 +275,7 @@ async def connect_data_source(source: str, symbol: str = "BTCUSDT"):
         
         rithmic_feed.on_trade = on_trade_received
         rithmic_feed.on_order_book = on_order_book_received
+        rithmic_feed.on_top_of_book = on_top_of_book_received
         rithmic_feed.on_connection_change = on_connection_change
         stream_task = asyncio.create_task(
             rithmic_feed.connect(
@@ -298,34 +349,81 @@ async def stop_streaming():
 
 # ==================== DATA CALLBACKS ====================
 
-async def on_trade_received(trade: Trade):
-    """Handle incoming trade data."""
-    global current_signal
+@lru_cache(maxsize=64)
+def _iso_seconds(seconds: int) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(seconds))
+
+
+def iso_from_ns(ts_ns: int) -> str:
+    """Format an epoch-nanosecond feed timestamp for WS payloads.
     
-    analytics_engine.add_trade(trade)
+    Same output as datetime.isoformat() on the naive UTC time; the seconds
+    part is cached since a burst of trades shares it, so no datetime is built.
+    """
+    seconds, ns = divmod(ts_ns, 1_000_000_000)
+    us = ns // 1000
+    return f"{_iso_seconds(seconds)}.{us:06d}" if us else _iso_seconds(seconds)
+
+
+def refresh_signal(symbol: str):
+    """Regenerate the current signal and queue it for signal_writer."""
+    global current_signal, current_signal_dict
     
-    if len(analytics_engine.trades) % 10 == 0:
-        symbol = current_settings.active_symbol if current_settings else trade.symbol
-        current_signal = analytics_engine.generate_signal(symbol)
-        
-        await db.signals.insert_one(current_signal.dict())
+    current_signal = analytics_engine.generate_signal(symbol)
+    current_signal_dict = current_signal.dict()
+    try:
+        # insert_many adds _id to its documents, so store a copy
+        signal_queue.put_nowait(dict(current_signal_dict))
+    except asyncio.QueueFull:
+        logger.warning("Signal queue full, dropping signal")
+
+
+async def signal_writer():
+    """Store queued signals with one insert_many per batch."""
+    while True:
+        batch = [await signal_queue.get()]
+        while len(batch) < SIGNAL_BATCH_SIZE and not signal_queue.empty():
+            batch.append(signal_queue.get_nowait())
+        try:
+            await db.signals.insert_many(batch, ordered=False)
+        except Exception as e:
+            logger.error(f"Failed to store {len(batch)} signals: {e}")
+
+
+async def on_trade_received(symbol: str, trades: TradeRingBuffer):
+    """Handle trades pushed into a feed's ring buffer since the last callback."""
+    price, qty, ts_ns, side, _ = trades.drain()
+    if not len(price):
+        return
     
-    await manager.broadcast({
-        "type": "trade",
-        "data": {
-            "symbol": trade.symbol,
-            "price": trade.price,
-            "quantity": trade.quantity,
-            "timestamp": trade.timestamp.isoformat(),
-            "side": "sell" if trade.is_buyer_maker else "buy"
-        }
-    })
+    prev_count = analytics_engine.trade_count
+    analytics_engine.add_trade_arrays(price, qty, ts_ns, side)
+    
+    if analytics_engine.trade_count // 10 > prev_count // 10:
+        signal_symbol = current_settings.active_symbol if current_settings else symbol
+        refresh_signal(signal_symbol)
+    
+    if manager.queues:
+        # The drained views are reused by later pushes, so copy them out here
+        pending_trades.extend({
+            "symbol": symbol,
+            "price": p,
+            "quantity": q,
+            "timestamp": iso_from_ns(t),
+            "side": "sell" if s else "buy"
+        } for p, q, t, s in zip(price.tolist(), qty.tolist(), ts_ns.tolist(), side.tolist()))
 
 async def on_order_book_received(order_book: OrderBook):
     """Handle incoming order book update."""
     analytics_engine.add_order_book(order_book)
     
-    await manager.broadcast({
+    # The payload is only built for the book that is still newest at flush time
+    if manager.queues:
+        pending_books[order_book.symbol] = order_book
+
+def order_book_message(order_book: OrderBook) -> dict:
+    """Top-10 "orderbook" WebSocket message for a full book."""
+    return {
         "type": "orderbook",
         "data": {
             "symbol": order_book.symbol,
@@ -333,20 +431,62 @@ async def on_order_book_received(order_book: OrderBook):
             "best_ask": order_book.best_ask,
             "spread": order_book.spread,
             "mid_price": order_book.mid_price,
-            "bids": [{"price": b.price, "quantity": b.quantity} for b in order_book.bids[:10]],
-            "asks": [{"price": a.price, "quantity": a.quantity} for a in order_book.asks[:10]],
-            "timestamp": order_book.timestamp.isoformat()
+            "bids": [{"price": p, "quantity": q}
+                     for p, q in zip(order_book.bid_px[:10].tolist(), order_book.bid_qty[:10].tolist())],
+            "asks": [{"price": p, "quantity": q}
+                     for p, q in zip(order_book.ask_px[:10].tolist(), order_book.ask_qty[:10].tolist())],
+            "timestamp": iso_from_ns(order_book.timestamp)
         }
-    })
+    }
+
+async def on_top_of_book_received(symbol: str, best_bid: float, best_ask: float,
+                                  bid_size: float, ask_size: float, ts_ns: int):
+    """Handle a best bid/offer update (no full book)."""
+    analytics_engine.add_top_of_book(best_bid, best_ask, bid_size, ask_size)
+    
+    if not manager.queues:
+        return
+    pending_books[symbol] = {
+        "type": "orderbook",
+        "data": {
+            "symbol": symbol,
+            "best_bid": best_bid,
+            "best_ask": best_ask,
+            "spread": round(best_ask - best_bid, 2),
+            "mid_price": round((best_bid + best_ask) / 2, 2),
+            "bids": [{"price": best_bid, "quantity": bid_size}],
+            "asks": [{"price": best_ask, "quantity": ask_size}],
+            "timestamp": iso_from_ns(ts_ns)
+        }
+    }
+
+async def flush_broadcasts():
+    """Send buffered market data to clients every BROADCAST_INTERVAL.
+    
+    Trades collected since the last tick go out as one "trades" message and
+    only the newest book per symbol is sent, so a busy feed costs one frame
+    per interval instead of one per event.
+    """
+    global pending_trades
+    
+    while True:
+        await asyncio.sleep(BROADCAST_INTERVAL)
+        if pending_trades:
+            batch, pending_trades = pending_trades, []
+            manager.broadcast({"type": "trades", "data": batch})
+        if pending_books:
+            for book in pending_books.values():
+                manager.broadcast(order_book_message(book) if isinstance(book, OrderBook) else book)
+            pending_books.clear()
 
 async def on_connection_change(connected: bool, symbol: str):
     """Handle connection status changes."""
-    await manager.broadcast({
+    manager.broadcast({
         "type": "connection",
         "data": {
             "connected": connected,
             "symbol": symbol,
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": iso_from_ns(time.time_ns())
         }
     })
 
@@ -358,9 +498,8 @@ async def get_openrouter_models(refresh: bool = False):
     if not openrouter_client.api_key and current_settings:
         openrouter_client.set_api_key(current_settings.openrouter.api_key)
     
-    models = await openrouter_client.fetch_models(force_refresh=refresh)
     return {
-        "models": [m.dict() for m in models],
+        "models": await openrouter_client.fetch_model_dicts(force_refresh=refresh),
         "is_connected": openrouter_client.is_connected,
         "selected_model": openrouter_client.selected_model
     }
@@ -409,10 +548,18 @@ async def ai_quick_summary():
 # ==================== SIGNAL ENDPOINTS ====================
 
 @api_router.get("/signals/current")
-async def get_current_signal():
-    """Get the current trading signal."""
-    if current_signal:
-        return current_signal.dict()
+async def get_current_signal(if_none_match: Optional[str] = Header(None)):
+    """Get the current trading signal.
+    
+    Each signal has its own uuid, which doubles as the ETag so pollers that
+    send If-None-Match get an empty 304 until a new signal is generated.
+    """
+    if current_signal_dict:
+        etag = f'"{current_signal_dict["id"]}"'
+        if if_none_match == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        return Response(json_dumps(current_signal_dict), media_type="application/json",
+                        headers={"ETag": etag})
     return {"signal_type": "no_trade", "message": "No signal generated yet"}
 
 @api_router.get("/signals/history")
@@ -425,12 +572,11 @@ async def get_signal_history(
     if signal_type:
         query["signal_type"] = signal_type
     
-    signals = await db.signals.find(query).sort("timestamp", -1).limit(limit).to_list(limit)
-    
-    for s in signals:
-        s['_id'] = str(s['_id'])
+    # Signals carry their own uuid "id", so Mongo's ObjectId is left out
+    signals = await db.signals.find(query, {"_id": 0}).sort("timestamp", -1).limit(limit).to_list(limit)
     
-    return {"signals": signals}
+    # Encoded directly rather than through FastAPI's per-field jsonable_encoder pass
+    return Response(json_dumps({"signals": signals}), media_type="application/json")
 
 @api_router.get("/metrics")
 async def get_current_metrics():
@@ -439,13 +585,42 @@ async def get_current_metrics():
 
 # ==================== WEBSOCKET ENDPOINT ====================
 
+# Client requests are tiny JSON objects; anything larger is ignored unparsed
+MAX_CLIENT_MESSAGE = 4096
+HEARTBEAT_INTERVAL = 30
+
+async def heartbeat(websocket: WebSocket):
+    """Queue a heartbeat for one client every HEARTBEAT_INTERVAL seconds."""
+    while True:
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        manager.send(websocket, {"type": "heartbeat"})
+
+def send_signal(websocket: WebSocket):
+    if current_signal_dict:
+        manager.send(websocket, {
+            "type": "signal",
+            "data": current_signal_dict
+        })
+
+def send_metrics(websocket: WebSocket):
+    manager.send(websocket, {
+        "type": "metrics",
+        "data": analytics_engine.get_all_metrics()
+    })
+
+WS_HANDLERS = {
+    "get_signal": send_signal,
+    "get_metrics": send_metrics,
+}
+
 @api_router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket endpoint for real-time data streaming."""
     await manager.connect(websocket)
+    beat = asyncio.create_task(heartbeat(websocket))
     
     try:
-        await websocket.send_json({
+        manager.send(websocket, {
             "type": "init",
             "data": {
                 "is_streaming": is_streaming,
@@ -455,30 +630,19 @@ async def websocket_endpoint(websocket: WebSocket):
         })
         
         while True:
-            try:
-                data = await asyncio.wait_for(websocket.receive_text(), timeout=30)
-                message = json.loads(data)
-                
-                if message.get("type") == "get_signal":
-                    if current_signal:
-                        await websocket.send_json({
-                            "type": "signal",
-                            "data": current_signal.dict()
-                        })
-                
-                elif message.get("type") == "get_metrics":
-                    await websocket.send_json({
-                        "type": "metrics",
-                        "data": analytics_engine.get_all_metrics()
-                    })
-                    
-            except asyncio.TimeoutError:
-                await websocket.send_json({"type": "heartbeat"})
+            data = await websocket.receive_text()
+            if len(data) > MAX_CLIENT_MESSAGE:
+                continue
+            handler = WS_HANDLERS.get(json_loads(data).get("type"))
+            if handler:
+                handler(websocket)
                 
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
+        pass
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
+    finally:
+        beat.cancel()
         manager.disconnect(websocket)
 
 # ==================== HEALTH ENDPOINTS ====================
@@ -522,7 +686,21 @@ app.add_middleware(
 @app.on_event("startup")
 async def startup_event():
     """Initialize on startup."""
-    global current_settings
+    global current_settings, flush_task, signal_writer_task
+    
+    # Let short tasks (relays, feed callbacks) run inline up to their first
+    # suspension instead of waiting a loop iteration; Python 3.12+ only
+    if hasattr(asyncio, "eager_task_factory"):
+        asyncio.get_running_loop().set_task_factory(asyncio.eager_task_factory)
+    
+    # Compile analytics kernels before any market data arrives
+    warmup_kernels()
+    flush_task = asyncio.create_task(flush_broadcasts())
+    signal_writer_task = asyncio.create_task(signal_writer())
+    
+    # Serve /signals/history from sorted index scans, with or without a type filter
+    await db.signals.create_index([("signal_type", 1), ("timestamp", -1)])
+    await db.signals.create_index([("timestamp", -1)])
     
     settings_doc = await db.settings.find_one({"_id": "main"})
     if settings_doc:
@@ -542,5 +720,10 @@ async def startup_event():
 async def shutdown_event():
     """Cleanup on shutdown."""
     await stop_streaming()
+    for task in (flush_task, signal_writer_task):
+        if task:
+            task.cancel()
+    await close_http_client()
+    await openrouter_client.close()
     client.close()
     logger.info("HFT Signal Generator stopped")
@@ -4,72 +4,151 @@ HFT Signal Generator Backend API Test Suite
 Tests all backend endpoints for functionality and data integrity.
 """
 
-import requests
+import asyncio
+import httpx
+import importlib.util
+import io
 import json
-import time
 import sys
+import time
 from datetime import datetime
-from typing import Dict, Any, Optional
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+# Try to import orjson for faster response decoding and result dumps
+try:
+    import orjson
+    json_loads = orjson.loads
+    
+    def dumps_indented(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+except ImportError:
+    json_loads = json.loads
+    
+    def dumps_indented(obj) -> bytes:
+        return json.dumps(obj, indent=2).encode()
+
+# HTTP/2 lets the concurrent checks share one connection; httpx needs h2 for it
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
 
 # Backend URL from environment
 BACKEND_URL = "https://orderflow-ai-1.preview.emergentagent.com/api"
+HEALTH_URL = f"{BACKEND_URL}/health"
+SETTINGS_URL = f"{BACKEND_URL}/settings"
+CONNECT_URL = f"{BACKEND_URL}/data-source/connect"
+DISCONNECT_URL = f"{BACKEND_URL}/data-source/disconnect"
+STATUS_URL = f"{BACKEND_URL}/data-source/status"
+CURRENT_SIGNAL_URL = f"{BACKEND_URL}/signals/current"
+METRICS_URL = f"{BACKEND_URL}/metrics"
+HISTORY_URL = f"{BACKEND_URL}/signals/history"
+RETRY_STATUSES = {502, 503, 504}
+RETRIES = 2
+
+# Any one of these top-level keys marks a well-formed response
+EXPECTED_SETTINGS_KEYS = frozenset({'rithmic', 'binance', 'openrouter', 'signal_weights'})
+EXPECTED_METRICS_SECTIONS = frozenset({'delta', 'absorption', 'iceberg', 'momentum', 'structure'})
 
 class BackendTester:
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'Content-Type': 'application/json',
-            'Accept': 'application/json'
-        })
+        self.session: Optional[httpx.AsyncClient] = None  # Opened by run_full_test_suite
         self.results = []
+        self._out = io.StringIO()  # Result lines, written out once per test phase
+        self._etags: Dict[str, str] = {}  # Last ETag seen per polled URL
+    
+    async def _request(self, method: str, url: str, timeout: float = 10,
+                       params: Optional[Dict[str, Any]] = None,
+                       headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        """Send a request, retrying gateway errors from the preview proxy with a short backoff."""
+        for attempt in range(RETRIES + 1):
+            response = await self.session.request(method, url, params=params, headers=headers,
+                                                  timeout=timeout)
+            if response.status_code not in RETRY_STATUSES or attempt == RETRIES:
+                return response
+            await asyncio.sleep(0.1 * 2 ** attempt)
+    
+    async def fetch(self, method: str, url: str, timeout: float = 10,
+                    params: Optional[Dict[str, Any]] = None) -> Tuple[int, str]:
+        """Send a request to the backend and return (status, body text)."""
+        response = await self._request(method, url, timeout=timeout, params=params)
+        return response.status_code, response.text
+    
+    async def conditional_get(self, url: str, timeout: float = 10) -> Tuple[int, str]:
+        """GET with If-None-Match from the last response's ETag.
+        
+        A 304 means the resource is unchanged and comes back with an empty
+        body; servers that send no ETag just answer 200 every time.
+        """
+        etag = self._etags.get(url)
+        response = await self._request("GET", url, timeout=timeout,
+                                       headers={'If-None-Match': etag} if etag else None)
+        etag = response.headers.get('ETag')
+        if etag:
+            self._etags[url] = etag
+        return response.status_code, response.text
+    
+    def flush_output(self):
+        """Write the buffered result lines to stdout in one go."""
+        sys.stdout.write(self._out.getvalue())
+        sys.stdout.flush()
+        self._out.seek(0)
+        self._out.truncate()
         
     def log_result(self, test_name: str, success: bool, message: str, response_data: Optional[Dict] = None):
-        """Log test result."""
+        """Log test result.
+        
+        Passing tests keep only the response's top-level keys and size; the
+        full body is stored for failures, where it helps diagnose them.
+        Timestamps are stored as epoch seconds and formatted when saved.
+        """
+        if success and response_data is not None:
+            response_data = {
+                'keys': list(response_data)[:20],
+                'size': len(response_data)
+            }
         result = {
             'test': test_name,
             'success': success,
             'message': message,
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': time.time(),
             'response_data': response_data
         }
         self.results.append(result)
         
         status = "✅ PASS" if success else "❌ FAIL"
-        print(f"{status} {test_name}: {message}")
+        self._out.write(f"{status} {test_name}: {message}\n")
         
         if response_data and not success:
-            print(f"   Response: {json.dumps(response_data, indent=2)}")
+            self._out.write(f"   Response: {dumps_indented(response_data).decode()}\n")
     
-    def test_health_endpoint(self):
+    async def test_health_endpoint(self):
         """Test GET /api/health endpoint."""
         try:
-            response = self.session.get(f"{BACKEND_URL}/health", timeout=10)
+            status, body = await self.fetch("GET", HEALTH_URL)
             
-            if response.status_code == 200:
-                data = response.json()
+            if status == 200:
+                data = json_loads(body)
                 if data.get('status') == 'healthy':
                     self.log_result("Health Check", True, "Backend is healthy", data)
                     return True
                 else:
                     self.log_result("Health Check", False, f"Unhealthy status: {data.get('status')}", data)
             else:
-                self.log_result("Health Check", False, f"HTTP {response.status_code}: {response.text}")
+                self.log_result("Health Check", False, f"HTTP {status}: {body}")
                 
         except Exception as e:
             self.log_result("Health Check", False, f"Connection error: {str(e)}")
         
         return False
     
-    def test_settings_endpoint(self):
+    async def test_settings_endpoint(self):
         """Test GET /api/settings endpoint."""
         try:
-            response = self.session.get(f"{BACKEND_URL}/settings", timeout=10)
+            status, body = await self.fetch("GET", SETTINGS_URL)
             
-            if response.status_code == 200:
-                data = response.json()
+            if status == 200:
+                data = json_loads(body)
                 # Check if settings structure is valid
-                expected_keys = ['rithmic', 'binance', 'openrouter', 'signal_weights']
-                has_structure = any(key in data for key in expected_keys)
+                has_structure = bool(EXPECTED_SETTINGS_KEYS & data.keys())
                 
                 if has_structure:
                     self.log_result("Settings Retrieval", True, "Settings retrieved successfully", data)
@@ -77,41 +156,41 @@ class BackendTester:
                 else:
                     self.log_result("Settings Retrieval", False, "Invalid settings structure", data)
             else:
-                self.log_result("Settings Retrieval", False, f"HTTP {response.status_code}: {response.text}")
+                self.log_result("Settings Retrieval", False, f"HTTP {status}: {body}")
                 
         except Exception as e:
             self.log_result("Settings Retrieval", False, f"Error: {str(e)}")
         
         return False
     
-    def test_data_source_connect(self):
+    async def test_data_source_connect(self):
         """Test POST /api/data-source/connect for simulated data."""
         try:
-            url = f"{BACKEND_URL}/data-source/connect?source=simulated&symbol=TEST"
-            response = self.session.post(url, timeout=15)
+            status, body = await self.fetch("POST", CONNECT_URL, timeout=15,
+                                            params={'source': 'simulated', 'symbol': 'TEST'})
             
-            if response.status_code == 200:
-                data = response.json()
+            if status == 200:
+                data = json_loads(body)
                 if data.get('status') == 'success':
                     self.log_result("Data Source Connect", True, "Connected to simulated data source", data)
                     return True
                 else:
                     self.log_result("Data Source Connect", False, f"Connection failed: {data}", data)
             else:
-                self.log_result("Data Source Connect", False, f"HTTP {response.status_code}: {response.text}")
+                self.log_result("Data Source Connect", False, f"HTTP {status}: {body}")
                 
         except Exception as e:
             self.log_result("Data Source Connect", False, f"Error: {str(e)}")
         
         return False
     
-    def test_data_source_status(self, expected_streaming=True):
+    async def test_data_source_status(self, expected_streaming=True):
         """Test GET /api/data-source/status endpoint."""
         try:
-            response = self.session.get(f"{BACKEND_URL}/data-source/status", timeout=10)
+            status, body = await self.fetch("GET", STATUS_URL)
             
-            if response.status_code == 200:
-                data = response.json()
+            if status == 200:
+                data = json_loads(body)
                 is_streaming = data.get('is_streaming', False)
                 
                 if is_streaming == expected_streaming:
@@ -123,20 +202,20 @@ class BackendTester:
                     actual_msg = "streaming" if is_streaming else "not streaming"
                     self.log_result("Data Source Status", False, f"Expected {expected_msg}, got {actual_msg}", data)
             else:
-                self.log_result("Data Source Status", False, f"HTTP {response.status_code}: {response.text}")
+                self.log_result("Data Source Status", False, f"HTTP {status}: {body}")
                 
         except Exception as e:
             self.log_result("Data Source Status", False, f"Error: {str(e)}")
         
         return False
     
-    def test_current_signal(self):
+    async def test_current_signal(self):
         """Test GET /api/signals/current endpoint."""
         try:
-            response = self.session.get(f"{BACKEND_URL}/signals/current", timeout=10)
+            status, body = await self.fetch("GET", CURRENT_SIGNAL_URL)
             
-            if response.status_code == 200:
-                data = response.json()
+            if status == 200:
+                data = json_loads(body)
                 
                 # Check if signal has required fields
                 if 'signal_type' in data:
@@ -149,24 +228,23 @@ class BackendTester:
                 else:
                     self.log_result("Current Signal", False, "Invalid signal structure", data)
             else:
-                self.log_result("Current Signal", False, f"HTTP {response.status_code}: {response.text}")
+                self.log_result("Current Signal", False, f"HTTP {status}: {body}")
                 
         except Exception as e:
             self.log_result("Current Signal", False, f"Error: {str(e)}")
         
         return False
     
-    def test_metrics_endpoint(self):
+    async def test_metrics_endpoint(self):
         """Test GET /api/metrics endpoint."""
         try:
-            response = self.session.get(f"{BACKEND_URL}/metrics", timeout=10)
+            status, body = await self.fetch("GET", METRICS_URL)
             
-            if response.status_code == 200:
-                data = response.json()
+            if status == 200:
+                data = json_loads(body)
                 
                 # Check for expected metric sections
-                expected_sections = ['delta', 'absorption', 'iceberg', 'momentum', 'structure']
-                has_sections = any(section in data for section in expected_sections)
+                has_sections = bool(EXPECTED_METRICS_SECTIONS & data.keys())
                 
                 if has_sections:
                     self.log_result("Metrics Retrieval", True, "Metrics retrieved successfully", data)
@@ -174,20 +252,20 @@ class BackendTester:
                 else:
                     self.log_result("Metrics Retrieval", False, "Missing expected metric sections", data)
             else:
-                self.log_result("Metrics Retrieval", False, f"HTTP {response.status_code}: {response.text}")
+                self.log_result("Metrics Retrieval", False, f"HTTP {status}: {body}")
                 
         except Exception as e:
             self.log_result("Metrics Retrieval", False, f"Error: {str(e)}")
         
         return False
     
-    def test_signal_history(self):
+    async def test_signal_history(self):
         """Test GET /api/signals/history endpoint."""
         try:
-            response = self.session.get(f"{BACKEND_URL}/signals/history?limit=10", timeout=10)
+            status, body = await self.fetch("GET", HISTORY_URL, params={'limit': 10})
             
-            if response.status_code == 200:
-                data = response.json()
+            if status == 200:
+                data = json_loads(body)
                 
                 if 'signals' in data:
                     signals = data['signals']
@@ -196,92 +274,107 @@ class BackendTester:
                 else:
                     self.log_result("Signal History", False, "Invalid response structure", data)
             else:
-                self.log_result("Signal History", False, f"HTTP {response.status_code}: {response.text}")
+                self.log_result("Signal History", False, f"HTTP {status}: {body}")
                 
         except Exception as e:
             self.log_result("Signal History", False, f"Error: {str(e)}")
         
         return False
     
-    def test_data_source_disconnect(self):
+    async def test_data_source_disconnect(self):
         """Test POST /api/data-source/disconnect endpoint."""
         try:
-            response = self.session.post(f"{BACKEND_URL}/data-source/disconnect", timeout=10)
+            status, body = await self.fetch("POST", DISCONNECT_URL)
             
-            if response.status_code == 200:
-                data = response.json()
+            if status == 200:
+                data = json_loads(body)
                 if data.get('status') == 'success':
                     self.log_result("Data Source Disconnect", True, "Disconnected successfully", data)
                     return True
                 else:
                     self.log_result("Data Source Disconnect", False, f"Disconnect failed: {data}", data)
             else:
-                self.log_result("Data Source Disconnect", False, f"HTTP {response.status_code}: {response.text}")
+                self.log_result("Data Source Disconnect", False, f"HTTP {status}: {body}")
                 
         except Exception as e:
             self.log_result("Data Source Disconnect", False, f"Error: {str(e)}")
         
         return False
     
-    def wait_for_signal_generation(self, max_wait=30):
+    async def wait_for_signal_generation(self, max_wait=30):
         """Wait for signals to be generated after connecting."""
         print(f"⏳ Waiting up to {max_wait}s for signal generation...")
         
-        for i in range(max_wait):
+        # Poll quickly at first, backing off to every 2s once it is clearly slow
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        delay = 0.1
+        while loop.time() - start < max_wait:
             try:
-                response = self.session.get(f"{BACKEND_URL}/signals/current", timeout=5)
-                if response.status_code == 200:
-                    data = response.json()
+                # An unchanged signal comes back as a bodiless 304, skipping the decode
+                status, body = await self.conditional_get(CURRENT_SIGNAL_URL, timeout=5)
+                if status == 200:
+                    data = json_loads(body)
                     if data.get('signal_type') != 'no_trade' and 'hfss_score' in data:
-                        print(f"✅ Signal generated after {i+1}s")
+                        print(f"✅ Signal generated after {loop.time() - start:.1f}s")
                         return True
                         
             except Exception:
                 pass
                 
-            time.sleep(1)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 2.0)
         
         print(f"⚠️  No signal generated after {max_wait}s (may be normal)")
         return False
     
-    def run_full_test_suite(self):
+    async def run_full_test_suite(self):
         """Run complete backend test suite."""
         print("🚀 Starting HFT Signal Generator Backend Test Suite")
         print(f"🔗 Testing backend at: {BACKEND_URL}")
         print("=" * 60)
         
-        # Test 1: Health check
-        if not self.test_health_endpoint():
-            print("❌ Backend health check failed - aborting tests")
-            return False
-        
-        # Test 2: Settings
-        self.test_settings_endpoint()
-        
-        # Test 3: Connect to simulated data source
-        if self.test_data_source_connect():
-            # Test 4: Check connection status (should be streaming)
-            time.sleep(2)  # Allow connection to establish
-            self.test_data_source_status(expected_streaming=True)
-            
-            # Wait for some data to be processed
-            self.wait_for_signal_generation()
-            
-            # Test 5: Current signal
-            self.test_current_signal()
-            
-            # Test 6: Metrics
-            self.test_metrics_endpoint()
+        # One pooled client so the concurrent read-only checks share keep-alive connections
+        async with httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            headers={'Content-Type': 'application/json', 'Accept': 'application/json'},
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=100, keepalive_expiry=30)
+        ) as self.session:
+            # Test 1: Health check, shown straight away
+            healthy = await self.test_health_endpoint()
+            self.flush_output()
+            if not healthy:
+                print("❌ Backend health check failed - aborting tests")
+                return False
             
-            # Test 7: Signal history
-            self.test_signal_history()
+            # Test 2: Settings
+            await self.test_settings_endpoint()
             
-            # Test 8: Disconnect
-            self.test_data_source_disconnect()
-            
-            # Test 9: Verify disconnected
-            time.sleep(1)
-            self.test_data_source_status(expected_streaming=False)
+            # Test 3: Connect to simulated data source
+            if await self.test_data_source_connect():
+                await asyncio.sleep(2)  # Allow connection to establish
+                
+                # Wait for some data to be processed; its progress prints are live
+                self.flush_output()
+                await self.wait_for_signal_generation()
+                
+                # Tests 4-7: Streaming status, current signal, metrics and signal
+                # history are independent reads, so they run concurrently
+                await asyncio.gather(
+                    self.test_data_source_status(expected_streaming=True),
+                    self.test_current_signal(),
+                    self.test_metrics_endpoint(),
+                    self.test_signal_history()
+                )
+                
+                # Test 8: Disconnect
+                await self.test_data_source_disconnect()
+                
+                # Test 9: Verify disconnected
+                await asyncio.sleep(1)
+                await self.test_data_source_status(expected_streaming=False)
+        
+        self.flush_output()
         
         # Summary
         print("\n" + "=" * 60)
@@ -305,11 +398,12 @@ class BackendTester:
 def main():
     """Main test execution."""
     tester = BackendTester()
-    success = tester.run_full_test_suite()
+    success = asyncio.run(tester.run_full_test_suite())
     
     # Save detailed results
-    with open('/app/backend_test_results.json', 'w') as f:
-        json.dump(tester.results, f, indent=2)
+    for result in tester.results:
+        result['timestamp'] = datetime.fromtimestamp(result['timestamp']).isoformat()
+    Path('/app/backend_test_results.json').write_bytes(dumps_indented(tester.results))
     
     print(f"\n📄 Detailed results saved to: /app/backend_test_results.json")
     
@@ -106,8 +106,8 @@ export default function Dashboard() {
       try {
         const data = JSON.parse(event.data);
         
-        if (data.type === 'trade') {
-          const newPrice = data.data.price;
+        if (data.type === 'trades') {
+          const newPrice = data.data[data.data.length - 1].price;
           if (lastPrice > 0) {
             setPriceChange(newPrice > lastPrice ? 'up' : newPrice < lastPrice ? 'down' : 'none');
           }
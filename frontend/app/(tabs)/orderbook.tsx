@@ -69,8 +69,10 @@ export default function OrderbookScreen() {
             ...data.data.asks.map((a: OrderBookLevel) => a.quantity)
           ];
           maxQuantity.current = Math.max(...allQuantities, 1);
-        } else if (data.type === 'trade') {
-          setTrades(prev => [data.data, ...prev.slice(0, 49)]);
+        } else if (data.type === 'trades') {
+          // Batches arrive oldest first; the list shows newest first
+          const batch: Trade[] = data.data.slice(-50).reverse();
+          setTrades(prev => [...batch, ...prev].slice(0, 50));
         } else if (data.type === 'connection') {
           setConnected(data.data.connected);
           setSymbol(data.data.symbol);